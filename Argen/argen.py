@@ -3,13 +3,18 @@
     argen - Command Line Argument Parser GENerator
 """
 import argparse
+import glob
 import os
 import sys
 import textwrap
 
 from error import Error
+import codegen
+import dispatch
 import helptextparser
+import profiling
 import argparser_hpp
+import argparser_py
 import argparser_cpp
 
 def find_first(s, func):
@@ -18,6 +23,7 @@ def find_first(s, func):
             return i
     return -1
 
+@profiling.profiled("formatText")
 def formatText(text, definitionLineNos, width, definitionIndent):
     result = []
     wrapper = textwrap.TextWrapper(width=width)
@@ -36,6 +42,27 @@ def formatText(text, definitionLineNos, width, definitionIndent):
             result.extend(wrapper.wrap(line))
     return "\n".join(result)
 
+def generatorFiles():
+    """Returns the source files and templates of the generator itself.
+    """
+    argenDir = os.path.dirname(os.path.abspath(__file__))
+    return sorted(glob.glob(os.path.join(argenDir, "*.py")) +
+                  [argparser_cpp.templateFileName(),
+                   argparser_hpp.templateFileName(),
+                   argparser_py.templateFileName()])
+
+def makeDependencyText(targets, dependencies):
+    """Returns the contents of a Makefile-style dependency file.
+    """
+    def escape(s):
+        return s.replace("$", "$$").replace("#", "\\#").replace(" ", "\\ ")
+    lines = [" ".join(escape(t) for t in targets) + ": \\"]
+    lines.extend("  %s \\" % escape(d) for d in dependencies[:-1])
+    lines.append("  %s" % escape(dependencies[-1]))
+    return "\n".join(lines) + "\n"
+
+CppStandards = ("c++11", "c++14", "c++17", "c++20")
+
 def makeArgParser():
     ap = argparse.ArgumentParser(description='Generates a C++ argument parser.')
     ap.add_argument("helpfile", metavar="text file",
@@ -55,6 +82,11 @@ def makeArgParser():
     ap.add_argument("--hpp", metavar="HPP",
                     dest="hpp", default="h",
                     help="the extension of the generated header file (default is h)")
+    ap.add_argument("--python",
+                    dest="python", action="store_const",
+                    const=True, default=False,
+                    help="also generate a Python module with the same "
+                         "parser, the file name is NAME.py")
     ap.add_argument("--function", metavar="NAME",
                     dest="functionName", default="parse_arguments",
                     help="the name of the generated function (default is parse_arguments)")
@@ -70,9 +102,94 @@ def makeArgParser():
                     dest="includeTest", action="store_const",
                     const=True, default=False,
                     help="Include a main-function the source file")
+    ap.add_argument("--benchmark",
+                    dest="benchmark", action="store_const",
+                    const=True, default=False,
+                    help="Include a main-function that runs the parser "
+                         "repeatedly on its command line arguments and "
+                         "reports the time and number of allocations per "
+                         "parse (implies --test)")
     ap.add_argument("--width", metavar="N", type=int,
                     dest="width", default=79,
                     help='line width for help text word wrapping (default is 79)')
+    ap.add_argument("--dispatch", metavar="STRATEGY",
+                    dest="dispatch", default="linear",
+                    choices=dispatch.DispatchStrategies,
+                    help="the way the generated parser looks up option flags: "
+                         "linear (a linear search, the default), switch "
+                         "(a switch on the flag length and characters) or "
+                         "hash (a perfect hash table)")
+    ap.add_argument("--std", metavar="STANDARD",
+                    dest="cppStandard", default="c++11",
+                    choices=CppStandards,
+                    help="the C++ standard targeted by the generated code "
+                         "(c++11, c++14, c++17 or c++20, default is c++11)")
+    ap.add_argument("--string-view",
+                    dest="stringView", action="store_const",
+                    const=True, default=False,
+                    help="make the generated iterator return std::string_view "
+                         "slices of argv instead of copies and use "
+                         "std::string_view for string members (requires "
+                         "--std=c++17 or later)")
+    ap.add_argument("--deferred-errors",
+                    dest="deferredErrors", action="store_const",
+                    const=True, default=False,
+                    help="record errors in the result instead of printing "
+                         "them, the message is only formatted when "
+                         "requested (requires --string-view)")
+    ap.add_argument("--response-files",
+                    dest="responseFiles", action="store_const",
+                    const=True, default=False,
+                    help="make the generated parser replace @FILE arguments "
+                         "with the arguments in FILE")
+    ap.add_argument("--response-file-depth", metavar="N", type=int,
+                    dest="responseFileDepth", default=8,
+                    help="the maximum number of levels response files can "
+                         "be nested (default is 8)")
+    ap.add_argument("--abbreviations",
+                    dest="abbreviations", action="store_const",
+                    const=True, default=False,
+                    help="make the generated parser accept unambiguous "
+                         "prefixes of the long option flags")
+    ap.add_argument("--compact",
+                    dest="compact", action="store_const",
+                    const=True, default=False,
+                    help="make multivalue options with a fixed number of "
+                         "values std::arrays and bool flags bitfields in "
+                         "the result")
+    ap.add_argument("--stream",
+                    dest="stream", action="store_const",
+                    const=True, default=False,
+                    help="add a function to the parser class that parses "
+                         "command lines read from a file descriptor")
+    ap.add_argument("--compress-help",
+                    dest="compressHelp", action="store_const",
+                    const=True, default=False,
+                    help="store the help text compressed in the generated "
+                         "parser, it is decompressed when it is displayed")
+    ap.add_argument("--only-if-changed",
+                    dest="onlyIfChanged", action="store_const",
+                    const=True, default=False,
+                    help="leave generated files whose contents are unchanged "
+                         "untouched, thereby keeping their modification times")
+    ap.add_argument("--depfile", metavar="FILE",
+                    dest="depFile", default="",
+                    help="write a Makefile-style dependency file listing "
+                         "the help text file and the generator's own files")
+    ap.add_argument("--profile",
+                    dest="profile", action="store_const",
+                    const=True, default=False,
+                    help="report the time spent in each stage of the "
+                         "generator")
+    ap.add_argument("--profile-format", metavar="FORMAT",
+                    dest="profileFormat", default="text",
+                    choices=("text", "json"),
+                    help="the format of the --profile report, text or json "
+                         "(default is text)")
+    ap.add_argument("--profile-output", metavar="FILE",
+                    dest="profileOutput", default="",
+                    help="write the --profile report to FILE instead of "
+                         "stderr")
     ap.add_argument("--debug",
                     dest="listProperties", action="store_const",
                     const=True, default=False,
@@ -98,6 +215,7 @@ def inferIndentation(line):
     gaps.sort()
     return gaps[-1][0] + gaps[-1][1]
 
+@profiling.profiled("inferOptionIndentation")
 def inferOptionIndentation(text, lineNos):
     lines = text.split("\n")
     widths = {}
@@ -115,16 +233,52 @@ def inferOptionIndentation(text, lineNos):
 
 def main(args):
     try:
-        args = makeArgParser().parse_args()
+        args = makeArgParser().parse_args(args[1:])
     except argparse.ArgumentError:
         return 1
+    return run(args)
+
+def run(args):
+    """run(parsed command line arguments) -> exit status
+
+    Generates the files for args, the result of
+    makeArgParser().parse_args(...), and reports the time spent in each
+    stage if args.profile is set.
+    """
+    if not args.profile:
+        return generate(args)
+    profiling.start()
+    try:
+        return generate(args)
+    finally:
+        # The report is kept out of stdout where it would be mixed with
+        # the generator's status messages.
+        report = profiling.stop().report(args.profileFormat)
+        if args.profileOutput:
+            codegen.writeFile(args.profileOutput, report + "\n")
+        else:
+            sys.stderr.write(report + "\n")
+
+def generate(args):
+    """generate(parsed command line arguments) -> exit status
+    """
+    cppStandard = int(args.cppStandard[3:])
+    if args.stringView and cppStandard < 17:
+        print("Error: --string-view requires --std=c++17 or later.")
+        return 1
+    if args.deferredErrors and not args.stringView:
+        print("Error: --deferred-errors requires --string-view.")
+        return 1
+    if args.responseFileDepth < 1:
+        print("Error: --response-file-depth must be at least 1.")
+        return 1
+    responseFileDepth = args.responseFileDepth if args.responseFiles else 0
     try:
+        parser = helptextparser.HelpTextParser()
         if args.parenthesis:
             parens = args.parenthesis.split()
             if len(parens) == 3 and parens[0] and parens[1] and parens[2]:
-                helptextparser.StartDefinition = parens[0]
-                helptextparser.DefinitionSeparator = parens[1]
-                helptextparser.EndDefinition = parens[2]
+                parser = helptextparser.HelpTextParser(*parens)
             else:
                 print("Invalid parenthesis: " + args.parenthesis)
                 print("The parenthesis string must consist of the opening "
@@ -136,7 +290,7 @@ def main(args):
                       " quotes. For instance to produce the default "
                       " perenthesis: \"--parenthesis=${ }$\".")
                 return 1
-        parserResult = helptextparser.parseFile(args.helpfile)
+        parserResult = parser.parseFile(args.helpfile)
     except IOError as ex:
         print(ex)
         return 2
@@ -173,26 +327,88 @@ def main(args):
         print("=========")
         print(text)
         return 0
+    if args.stringView:
+        for m in parserResult.members:
+            m.useStringView()
+    if args.compact:
+        for m in parserResult.members:
+            m.useCompactLayout()
+        # Bitfields are only packed together if they are declared next
+        # to each other.
+        parserResult.members.sort(key=lambda m: m.isBitfield)
     try:
         hppFile = args.fileName + "." + args.hpp
-        argparser_hpp.createFile(hppFile,
-                                 parserResult.members,
-                                 className=args.className,
-                                 functionName=args.functionName,
-                                 namespace=args.namespace)
+        hppWritten = argparser_hpp.createFile(
+                hppFile,
+                parserResult.members,
+                onlyIfChanged=args.onlyIfChanged,
+                className=args.className,
+                functionName=args.functionName,
+                namespace=args.namespace,
+                deferredErrors=args.deferredErrors,
+                responseFileDepth=responseFileDepth,
+                abbreviations=args.abbreviations,
+                stream=args.stream,
+                stringView=args.stringView)
         cppFile = args.fileName + "." + args.cpp
-        argparser_cpp.createFile(cppFile,
-                                 text,
-                                 parserResult.options,
-                                 parserResult.arguments,
-                                 parserResult.members,
-                                 className=args.className,
-                                 functionName=args.functionName,
-                                 namespace=args.namespace,
-                                 headerFileName=os.path.basename(hppFile),
-                                 includeTest=args.includeTest)
-        print("%s: generated %s and %s"
-              % (os.path.basename(sys.argv[0]), hppFile, cppFile))
+        cppWritten = argparser_cpp.createFile(
+                cppFile,
+                text,
+                parserResult.options,
+                parserResult.arguments,
+                parserResult.members,
+                onlyIfChanged=args.onlyIfChanged,
+                className=args.className,
+                functionName=args.functionName,
+                namespace=args.namespace,
+                headerFileName=os.path.basename(hppFile),
+                includeTest=args.includeTest or args.benchmark,
+                benchmark=args.benchmark,
+                deferredErrors=args.deferredErrors,
+                responseFileDepth=responseFileDepth,
+                compressHelp=args.compressHelp,
+                abbreviations=args.abbreviations,
+                stream=args.stream,
+                dispatchStrategy=args.dispatch,
+                cppStandard=cppStandard,
+                stringView=args.stringView)
+        targets = [hppFile, cppFile]
+        if args.python:
+            pyFile = args.fileName + ".py"
+            pyWritten = argparser_py.createFile(
+                    pyFile,
+                    text,
+                    parserResult.options,
+                    parserResult.arguments,
+                    parserResult.members,
+                    onlyIfChanged=args.onlyIfChanged,
+                    className=args.className,
+                    functionName=args.functionName,
+                    includeTest=args.includeTest,
+                    abbreviations=args.abbreviations)
+            targets.append(pyFile)
+        if args.depFile:
+            codegen.writeFile(args.depFile,
+                              makeDependencyText(targets,
+                                                 [args.helpfile] +
+                                                 generatorFiles()),
+                              args.onlyIfChanged)
+        progName = os.path.basename(sys.argv[0])
+        if hppWritten and cppWritten:
+            print("%s: generated %s and %s" % (progName, hppFile, cppFile))
+        elif hppWritten or cppWritten:
+            print("%s: generated %s, %s is unchanged"
+                  % ((progName,) + ((hppFile, cppFile) if hppWritten
+                                    else (cppFile, hppFile))))
+        else:
+            print("%s: %s and %s are unchanged" % (progName, hppFile, cppFile))
+        if args.python and pyWritten:
+            print("%s: generated %s" % (progName, pyFile))
+        elif args.python:
+            print("%s: %s is unchanged" % (progName, pyFile))
+    except Error as ex:
+        print(ex)
+        return 3
     except Exception as ex:
         print("Error: " + str(ex))
         raise
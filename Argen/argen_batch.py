@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+"""
+    argen_batch - runs argen for many help text files in a single process
+
+    The jobs are read from a manifest file, where each line contains the
+    command line arguments for one invocation of argen, and/or found with
+    glob patterns, in which case the generated files are placed in the same
+    directory as the help text file. Arguments following "--" are passed
+    to all jobs.
+"""
+import argparse
+import concurrent.futures
+import glob
+import io
+import os
+import shlex
+import sys
+import time
+import traceback
+
+import argen
+
+class Job:
+    def __init__(self, name, argv):
+        self.name = name
+        self.argv = argv
+
+def readManifest(fileName, commonArgs):
+    jobs = []
+    for lineNo, line in enumerate(open(fileName), 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        jobs.append(Job("%s:%d" % (fileName, lineNo),
+                        commonArgs + shlex.split(line)))
+    return jobs
+
+def globJobs(pattern, commonArgs):
+    jobs = []
+    for helpFile in sorted(glob.glob(pattern)):
+        jobs.append(Job(helpFile, commonArgs + [helpFile]))
+    return jobs
+
+def makeOutput():
+    return io.StringIO() if sys.version_info[0] >= 3 else io.BytesIO()
+
+def parseJobArgs(argv, placeNextToHelpFile):
+    args = argen.makeArgParser().parse_args(argv)
+    if placeNextToHelpFile and not os.path.isabs(args.fileName):
+        args.fileName = os.path.join(os.path.dirname(args.helpfile),
+                                     args.fileName)
+    return args
+
+def outputFiles(argv, placeNextToHelpFile):
+    """outputFiles(argen arguments, bool) -> list of absolute paths
+
+    Returns the files a job writes, or an empty list if its arguments
+    are invalid, which is reported when the job is run.
+    """
+    stderr = sys.stderr
+    sys.stderr = makeOutput()
+    try:
+        args = parseJobArgs(argv, placeNextToHelpFile)
+    except SystemExit:
+        return []
+    finally:
+        sys.stderr = stderr
+    files = [args.fileName + "." + args.hpp, args.fileName + "." + args.cpp]
+    if args.python:
+        files.append(args.fileName + ".py")
+    if args.depFile:
+        files.append(args.depFile)
+    return [os.path.normcase(os.path.abspath(f)) for f in files]
+
+def findConflictingJobs(jobs):
+    """findConflictingJobs(list of (job, bool)) -> dict of job -> result
+
+    Jobs running in parallel would overwrite each other's files, so each
+    file can only be written by one job. The results of the later jobs
+    writing a file that an earlier job writes too are returned.
+    """
+    writers = {}
+    conflicts = {}
+    for job, nextToHelpFile in jobs:
+        files = outputFiles(job.argv, nextToHelpFile)
+        for f in files:
+            if f in writers:
+                conflicts[job] = (1, 0.0, "Error: %s is also written by %s."
+                                          % (f, writers[f].name))
+                break
+        else:
+            writers.update((f, job) for f in files)
+    return conflicts
+
+def runJob(argv, placeNextToHelpFile):
+    """runJob(argen arguments, bool) -> (exit status, seconds, output)
+
+    Runs argen with the given arguments and returns its exit status, the
+    time it took and the text it wrote to stdout and stderr.
+    """
+    output = makeOutput()
+    stdout, stderr = sys.stdout, sys.stderr
+    sys.stdout = sys.stderr = output
+    start = time.time()
+    try:
+        status = argen.run(parseJobArgs(argv, placeNextToHelpFile))
+    except SystemExit as ex:
+        status = ex.code if isinstance(ex.code, int) else 1
+    except Exception:
+        traceback.print_exc()
+        status = 3
+    finally:
+        sys.stdout, sys.stderr = stdout, stderr
+    return status, time.time() - start, output.getvalue()
+
+def makeArgParser():
+    ap = argparse.ArgumentParser(
+            description="Generates C++ argument parsers for many help text "
+                        "files in a single process.",
+            usage="%(prog)s [options] [manifest] [-- argen options]")
+    ap.add_argument("manifest", metavar="manifest", nargs="?",
+                    help="a text file where each line contains the argen "
+                         "arguments for one parser")
+    ap.add_argument("--glob", metavar="PATTERN",
+                    dest="patterns", action="append", default=[],
+                    help="generate parsers for the help text files matching "
+                         "PATTERN, the generated files are placed next to "
+                         "the help text files (may be given more than once)")
+    ap.add_argument("-j", "--jobs", metavar="N", type=int,
+                    dest="jobs", default=None,
+                    help="the number of worker processes (default is the "
+                         "number of CPUs, 1 runs all jobs in this process)")
+    ap.add_argument("-v", "--verbose",
+                    dest="verbose", action="store_const",
+                    const=True, default=False,
+                    help="show argen's output for successful jobs too")
+    return ap
+
+def main(args):
+    args = args[1:]
+    commonArgs = []
+    if "--" in args:
+        i = args.index("--")
+        args, commonArgs = args[:i], args[i + 1:]
+    ap = makeArgParser()
+    args = ap.parse_args(args)
+    if args.jobs is not None and args.jobs < 1:
+        ap.error("the number of jobs must be at least 1")
+    jobs = []
+    if args.manifest:
+        try:
+            jobs.extend((j, False)
+                        for j in readManifest(args.manifest, commonArgs))
+        except IOError as ex:
+            print(ex)
+            return 2
+    for pattern in args.patterns:
+        jobs.extend((j, True) for j in globJobs(pattern, commonArgs))
+    if not jobs:
+        print("No help text files to generate parsers for.")
+        return 1
+
+    start = time.time()
+    results = []
+    conflicts = findConflictingJobs(jobs)
+    for job, nextToHelpFile in jobs:
+        if job in conflicts:
+            results.append((job, conflicts[job]))
+            reportJob(*results[-1], verbose=args.verbose)
+    jobs = [(job, nextToHelpFile) for job, nextToHelpFile in jobs
+            if job not in conflicts]
+    if args.jobs == 1:
+        for job, nextToHelpFile in jobs:
+            results.append((job, runJob(job.argv, nextToHelpFile)))
+            reportJob(*results[-1], verbose=args.verbose)
+    else:
+        with concurrent.futures.ProcessPoolExecutor(args.jobs) as executor:
+            futures = dict((executor.submit(runJob, job.argv, nextToHelpFile),
+                            job)
+                           for job, nextToHelpFile in jobs)
+            for future in concurrent.futures.as_completed(futures):
+                results.append((futures[future], future.result()))
+                reportJob(*results[-1], verbose=args.verbose)
+
+    failed = [job for job, result in results if result[0] != 0]
+    print("%d of %d jobs succeeded in %.2f s (%.2f s in argen)"
+          % (len(results) - len(failed), len(results), time.time() - start,
+             sum(result[1] for job, result in results)))
+    return 1 if failed else 0
+
+def reportJob(job, result, verbose):
+    status, seconds, output = result
+    print("%-4s %7.3f s  %s" % ("ok" if status == 0 else "FAIL", seconds,
+                                job.name))
+    if status != 0 or verbose:
+        for line in output.splitlines():
+            print("    " + line)
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -1,5 +1,10 @@
 import codegen
+import compression
+import constants
+import dispatch
 import os
+import profiling
+import re
 
 def isMandatory(member):
     return member.isOption and member.minCount == 1 and member.type != "list"
@@ -9,23 +14,143 @@ def isTrackable(member):
              (member.count == (1, 1)) or
              (member.type == "list" and member.default)) or
             (member.action) or
-            (member.condition))
+            (member.condition) or
+            (member.env) or
+            isMandatory(member))
+
+def defaultArrayType(member):
+    """Returns the element type of a constant array that can hold the
+    default values of member, or "" if member doesn't need one.
+
+    Only lists and multi-values with several different default values,
+    whose types can be initialized without running any code, need arrays.
+    """
+    if (member.type not in ("list", "multivalue") or member.isArray or
+            not member.default):
+        return ""
+    values = member.default.split("|")
+    if len(set(values)) == 1 or not all(values):
+        return ""
+    if member.valueType in ("std::string", "std::string_view"):
+        return "char* const"
+    elif (member.valueType in constants.IntegerValueTypes or
+          member.valueType in constants.FloatingPointValueTypes or
+          member.valueType == "bool"):
+        return member.valueType
+    return ""
+
+def makeProcessorLines(template, expander):
+    """Expands the template of an option or argument processor.
+
+    Leaves the state parameter unnamed if the function body doesn't use
+    it, to avoid unused-parameter warnings.
+    """
+    lines = codegen.makeLines(template, expander)
+    start = next(i for i, s in enumerate(lines) if s.strip() == "{")
+    if not any(re.search(r"\bstate\b", s) for s in lines[start:]):
+        lines[:start] = [s.replace("::State& state,", "::State&,")
+                         for s in lines[:start]]
+    return lines
+
+def cppChar(c):
+    """cppChar(byte value) -> C++ character literal
+    """
+    if c in (ord("'"), ord("\\")):
+        return "'\\%s'" % chr(c)
+    elif 32 <= c < 127:
+        return "'%s'" % chr(c)
+    else:
+        return "'\\x%02X'" % c
+
+def switchDispatch(results, size, data, subject):
+    """switchDispatch(dict of string -> C++ expression, ...) -> lines
+
+    Returns a switch on size with a nested switch cascade for the strings
+    of each length that returns the expression of the string equal to
+    subject.
+    """
+    def caseLines(tree, n):
+        if not isinstance(tree, tuple):
+            return ['if (std::memcmp(%s, "%s", %d) == 0)' % (data, tree, n),
+                    "    return %s;" % results[tree]]
+        pos, children = tree
+        lines = ["switch (%s[%d])" % (subject, pos), "{"]
+        for c, child in children:
+            lines.append("case %s:" % cppChar(c))
+            lines.extend("    " + s for s in caseLines(child, n))
+            lines.append("    break;")
+        lines.append("default:")
+        lines.append("    break;")
+        lines.append("}")
+        return lines
+    lines = ["switch (%s)" % size, "{"]
+    for n, strings in dispatch.groupByLength(list(results)):
+        lines.append("case %d:" % n)
+        lines.extend("    " + s
+                     for s in caseLines(dispatch.makeSwitchTree(strings), n))
+        lines.append("    break;")
+    lines.append("default:")
+    lines.append("    break;")
+    lines.append("}")
+    return lines
+
+def cppStringLines(s):
+    """cppStringLines(string) -> list of C++ string literals
+
+    Splits s at the newlines and returns the lines as C++ string literals
+    that together make up s.
+    """
+    parts = s.replace("\\", r"\\").replace('"', r'\"').split("\n")
+    lines = ['"%s\\n"' % p for p in parts[:-1]]
+    if parts[-1] or not lines:
+        lines.append('"%s"' % parts[-1])
+    return lines
+
+def toStdString(stringView, expr):
+    """Returns the C++ expression that converts expr to a std::string.
+
+    Needed where error messages are concatenated with string_views.
+    """
+    return "std::string(%s)" % expr if stringView else expr
+
+def errorCode(className, deferredErrors, code, limit="0"):
+    """Returns the error code and limit arguments of a call to error().
+
+    They are empty unless the errors are deferred, the message is the only
+    argument the ordinary error() needs.
+    """
+    if not deferredErrors:
+        return ""
+    return "%s::ERROR_%s, %s, " % (className, code, limit)
+
+def valueError(className, deferredErrors, stringView, code, message, expr):
+    """Returns the arguments following flag and result in a call to
+    error() for an invalid or illegal value.
+    """
+    if not deferredErrors:
+        return '"%s \\"" + %s + "\\"."' % (message,
+                                            toStdString(stringView, expr))
+    return '%s::ERROR_%s, 0, "%s", %s' % (className, code, message, expr)
 
 class CppExpander(codegen.Expander):
     def __init__(self, text, opts, args, members, className="ParseArguments",
                  fileName="ParseArguments.cpp",
                  functionName="parseArguments", namespace="",
                  headerFileName="ParseArguments.hpp",
-                 includeTest=True):
+                 includeTest=True, dispatchStrategy="linear",
+                 cppStandard=11, stringView=False, benchmark=False,
+                 deferredErrors=False, responseFileDepth=0,
+                 compressHelp=False, abbreviations=False, stream=False):
         codegen.Expander.__init__(self)
         self._options = sorted(opts, key=lambda o: o.name)
         self._args = args
         self._members = members
         self.headerFileName = headerFileName
         self.namespace = namespace.split("::") if namespace else []
-        self.helpText = ['"%s\\n"' % s for s in
-                         text.replace("\\", r"\\").replace('"', r'\"')
-                             .split("\n")]
+        self.__helpText = text + "\n"
+        self.stringView = stringView
+        self.stringType = "std::string_view" if stringView else "std::string"
+        self.cStr = "data" if stringView else "c_str"
         self.hasShortOptions = self.__hasShortOptions()
         self.hasDashOptions = any(o for o in opts if
                                   any(f for f in o.flags
@@ -46,16 +171,40 @@ class CppExpander(codegen.Expander):
         self.qualifiedClassName = namespace + "::" + className
         self.functionName = functionName
         self.qualifiedFunctionName = namespace + "::" + functionName
-        self.hasTrackedOptions = any(m for m in members if isTrackable(m))
+        self.namespacePrefix = namespace + "::"
+        self.__trackedMembers = [m for m in members if isTrackable(m)]
+        self.hasTrackedOptions = bool(self.__trackedMembers)
+        self.trackedWordCount = (len(self.__trackedMembers) + 63) // 64
         self.hasMandatoryOptions = any(m for m in members if isMandatory(m))
         self.includeTest = includeTest
+        self.benchmark = benchmark
+        self.deferredErrors = deferredErrors
+        self.responseFiles = responseFileDepth > 0
+        self.responseFileDepth = responseFileDepth
+        self.compressHelp = compressHelp
+        self.stream = stream
+        self._environmentOptions = sorted(
+                (m.env, [a for a in m.arguments if a.value is None][0])
+                for m in members if m.env)
+        self.hasEnvironmentOptions = bool(self._environmentOptions)
+        self.environmentOptionCount = len(self._environmentOptions)
+        helpText = self.__helpText.replace("$prog$", "")
+        self.helpTextSize = len(helpText.encode("utf-8"))
+        if deferredErrors:
+            self.exitWithError = "exitWithError(state, result)"
+        else:
+            self.exitWithError = "exit(result.%s_result)" % functionName
         self.memberWidth = min(20, max(len(m.name) + 1 for m in members))
         self.hasFinalOption = any(m for m in members if m.type == "final")
+        self.hasDefaultValueArrays = any(m for m in members
+                                         if defaultArrayType(m))
         self.hasDelimitedValues = (any(o for o in opts if o.delimiter) or
                                    any(a for a in args if a.delimiter))
         self.hasMinimumListLengths = any(
-                m for m in members if m.type == "list" and m.minCount != 0)
+                m for m in members
+                if m.isOption and m.type == "list" and m.minCount != 0)
         self.minArguments, self.maxArguments = self.__argumentCount()
+        self.hasArguments = bool(args)
         self.hasMinArguments = self.minArguments != 0
         self.hasMaxArguments = self.maxArguments != -1
         self.hasFixedNumberOfArguments = (
@@ -68,12 +217,66 @@ class CppExpander(codegen.Expander):
                 if not o.value and o.delimiter and o.member.values)
         self.hasDelimitedValuesWithoutCheck = any(o for o in opts
                 if not o.value and o.delimiter and not o.member.values)
+        self.hasArrayValuesWithCheck = any(o for o in opts
+                if not o.value and o.member.isArray and o.member.values)
+        self.hasArrayValuesWithoutCheck = any(o for o in opts
+                if not o.value and o.member.isArray and not o.member.values)
         self.hasInfoOptions = any(m for m in members if m.type == "info")
         self.requiresNextValue = any(o for o in opts if not o.value or
                                      o.member.type == "final")
         self.requiresFromString = args or any(o for o in opts if not o.value)
+        self.__initConversions(cppStandard)
         self.hasMemberActionsOrConditions = any(m for m in members
                                                 if m.condition or m.action)
+        self.hasHashDispatch = dispatchStrategy == "hash"
+        self._longFlags = [p for p in self.__optionProcessors()
+                           if self.__isLongFlag(p[0])]
+        self.abbreviations = abbreviations and bool(self._longFlags)
+        self.minAbbreviationLength = 3 if self.hasShortOptions else 2
+        if self.abbreviations:
+            self.__flagTrie = dispatch.FlagTrie(self._longFlags,
+                                                self.minAbbreviationLength)
+            self.hasAmbiguousAbbreviations = bool(self.__flagTrie.ambiguities)
+        self.includeCstdint = (self.hasHashDispatch or
+                               self.hasTrackedOptions or self.abbreviations)
+        self.hasSwitchDispatch = dispatchStrategy == "switch"
+        self.optionProcessorCount = len(self.__optionProcessors())
+        if self.hasHashDispatch:
+            self.__hashSeeds, self.__hashSlots = dispatch.makePerfectHash(
+                    [f for f, func in self.__optionProcessors()])
+
+    def __initConversions(self, cppStandard):
+        types = set(m.valueType for m in self._members
+                    if m.type not in ("help", "info", "final"))
+        unknown = types.difference(constants.IntegerValueTypes,
+                                   constants.FloatingPointValueTypes,
+                                   ("bool", "std::string",
+                                    "std::string_view"))
+        self.hasStreamConversion = bool(unknown)
+        # Typedefs of numeric types can't be recognized by their names, the
+        # number conversions are therefore included with the stream
+        # conversion.
+        self.hasNumberConversion = bool(
+                unknown or
+                types.intersection(constants.IntegerValueTypes) or
+                types.intersection(constants.FloatingPointValueTypes))
+        # fromString is only called for the values of options that take
+        # a value and for arguments that aren't strings.
+        converted = [o.member for o in self._options
+                     if not o.value and
+                     o.member.type not in ("help", "info", "final")]
+        self.hasStringConversion = any(m for m in converted if m.isString)
+        converted.extend(a.member for a in self._args)
+        self.hasBoolConversion = any(m for m in converted
+                                     if m.valueType == "bool")
+        self.hasNumberOrBoolConversion = (self.hasNumberConversion or
+                                          self.hasBoolConversion)
+        self.hasFromChars = self.hasNumberConversion and cppStandard >= 17
+        self.hasStrtol = self.hasNumberConversion and cppStandard < 17
+        self.includeCerrno = self.hasStrtol or self.stream
+        # Floating point values are read with a stream if the program has
+        # set a C locale that strtod can't handle.
+        self.includeSstream = self.hasStreamConversion or self.hasStrtol
 
     def __argumentCount(self):
         minc, maxc = 0, 0
@@ -92,6 +295,13 @@ class CppExpander(codegen.Expander):
                 return True
         return False
 
+    def __isLongFlag(self, flag):
+        """True if flag is one of the flags that can be abbreviated.
+        """
+        if self.hasShortOptions:
+            return len(flag) > 2 and flag[:2] == "--"
+        return len(flag) > 1 and flag[0] in "-/"
+
     def __hasShortOptions(self):
         dashes = set()
         slashes = set()
@@ -120,7 +330,7 @@ class CppExpander(codegen.Expander):
 
     def includeVector(self, params, context):
         for m in self._members:
-            if m.type in ("list", "multivalue"):
+            if m.type in ("list", "multivalue") and not m.isArray:
                 return False
         return True
 
@@ -130,6 +340,52 @@ class CppExpander(codegen.Expander):
                 return False
         return True
 
+    def helpTextSegments(self, params, context):
+        lines = []
+        for segment in self.__helpText.split("$prog$"):
+            strings = cppStringLines(segment)
+            strings[0] = "{" + strings[0]
+            strings[1:] = [" " + s for s in strings[1:]]
+            strings[-1] += ", %d}," % len(segment.encode("utf-8"))
+            lines.extend(strings)
+        return lines
+
+    def helpTextSizes(self, params, context):
+        return ", ".join(str(len(s.encode("utf-8")))
+                         for s in self.__helpText.split("$prog$"))
+
+    def compressedHelpText(self, params, context):
+        data = compression.compress(bytearray(
+                self.__helpText.replace("$prog$", "").encode("utf-8")))
+        return [" ".join("0x%02X," % c for c in data[i:i + 12])
+                for i in range(0, len(data), 12)]
+
+    def shortOptionFlags(self, params, context):
+        """The null-terminated flags of all 256 possible short options.
+        """
+        prefix = "-" if self.hasDashOptions else "/"
+        entries = []
+        for c in range(256):
+            if c in (ord('"'), ord("\\")):
+                entries.append("%s\\%s\\000" % (prefix, chr(c)))
+            elif 32 <= c < 127:
+                entries.append("%s%s\\000" % (prefix, chr(c)))
+            else:
+                entries.append("%s\\%03o\\000" % (prefix, c))
+        return ['"%s"' % "".join(entries[i:i + 8])
+                for i in range(0, len(entries), 8)]
+
+    def toStdString(self, params, context):
+        return toStdString(self.stringView, ", ".join(params))
+
+    def errorCode(self, params, context):
+        return errorCode(self.className, self.deferredErrors, params[0])
+
+    def valueError(self, params, context):
+        return valueError(self.className, self.deferredErrors,
+                          self.stringView, params[0], params[1].strip(),
+                          ", ".join(p.strip() for p in params[2:]))
+
     def beginNamespace(self, params, context):
         return "namespace " + " { namespace ".join(self.namespace) + " {"
 
@@ -139,11 +395,21 @@ class CppExpander(codegen.Expander):
     def memberInitializers(self, params, context):
         lines = []
         for m in self._members:
-            if m.type in ("list", "multivalue") and m.minCount == 0:
+            if m.isArray:
+                if m.default:
+                    lines.append("%s{{%s}}" % (m.name,
+                                               ", ".join(m.default.split("|"))))
+                else:
+                    lines.append("%s()" % m.name)
+            elif m.type in ("list", "multivalue") and m.minCount == 0:
                 if m.default:
                     v = m.default.split("|")
                     if len(set(v)) == 1 and v[0]:
                         lines.append("%s(%d, %s)" % (m["name"], len(v), v[0]))
+                    elif defaultArrayType(m):
+                        lines.append("%s(std::begin(default_%s), "
+                                     "std::end(default_%s))"
+                                     % (m.name, m.name, m.name))
                     else:
                         lines.append("%s(%d)" % (m["name"], len(v)))
                 elif m.type in "multivalue":
@@ -154,15 +420,75 @@ class CppExpander(codegen.Expander):
             lines[i] += ","
         return lines
 
+    def defaultValueArrays(self, params, context):
+        """Declares constant arrays with the default values of the lists
+        and multi-values whose default values are different literals.
+
+        The arrays are initialized at compile time and the members are
+        constructed from them in one go.
+        """
+        lines = []
+        for m in self._members:
+            arrayType = defaultArrayType(m)
+            if arrayType:
+                lines.append("const %s default_%s[] = {%s};"
+                             % (arrayType, m.name,
+                                ", ".join(m.default.split("|"))))
+        return lines
+
     def multiValueInitialization(self, params, context):
+        prefix = params[0] if params else ""
         lines = []
         for m in self._members:
-            if m.type not in ("list", "multivalue") or not m.default:
+            if (m.type not in ("list", "multivalue") or m.isArray or
+                    not m.default):
                 continue
             v = m.default.split("|")
-            if len(set(v)) > 1:
+            if len(set(v)) > 1 and not defaultArrayType(m):
                 for i in range(len(v)):
-                    lines.append("%s[%d] = %s;" % (m["name"], i, v[i]))
+                    lines.append("%s%s[%d] = %s;" % (prefix, m["name"], i,
+                                                     v[i]))
+        return lines
+
+    def resetMembers(self, params, context):
+        """Assigns the same values to the members of result as the
+        constructor does, without releasing the memory they have allocated.
+        """
+        lines = []
+        for m in self._members:
+            if m.type == "final":
+                continue
+            if m.isArray:
+                if m.default:
+                    lines.append("result.%s = %s{{%s}};"
+                                 % (m.name, m.memberType,
+                                    ", ".join(m.default.split("|"))))
+                else:
+                    lines.append("result.%s = %s();" % (m.name, m.memberType))
+            elif defaultArrayType(m):
+                lines.append("result.%s.assign(std::begin(default_%s), "
+                             "std::end(default_%s));"
+                             % (m.name, m.name, m.name))
+            elif m.type in ("list", "multivalue"):
+                lines.append("result.%(name)s.clear();" % m)
+                if m.minCount != 0:
+                    continue
+                if m.default:
+                    v = m.default.split("|")
+                    if len(set(v)) == 1 and v[0]:
+                        lines.append("result.%s.resize(%d, %s);"
+                                     % (m.name, len(v), v[0]))
+                    else:
+                        lines.append("result.%s.resize(%d);"
+                                     % (m.name, len(v)))
+                elif m.type == "multivalue":
+                    lines.append("result.%(name)s.resize(%(maxCount)d);" % m)
+            elif m.default:
+                lines.append("result.%(name)s = %(default)s;" % m)
+            elif m.memberType == "std::string":
+                lines.append("result.%(name)s.clear();" % m)
+            else:
+                lines.append("result.%(name)s = %(memberType)s();" % m)
         return lines
 
     def printMembers(self, params, context):
@@ -170,7 +496,7 @@ class CppExpander(codegen.Expander):
         for m in self._members:
             if m.type in ("list", "multivalue"):
                 lines.append("PRINT_LIST(%(name)s);" % m)
-            elif m.valueType == "std::string":
+            elif m.isString:
                 lines.append("PRINT_STRING(%(name)s);" % m)
             elif m.type != "final":
                 lines.append("PRINT_VALUE(%(name)s);" % m)
@@ -187,42 +513,96 @@ class CppExpander(codegen.Expander):
             poe = ProcessOptionExpander(context, self, m, o)
             if m.type == "help":
                 tmpl = processHelpOptionTemplate
-                lines.extend(codegen.makeLines(tmpl, poe))
+                lines.extend(makeProcessorLines(tmpl, poe))
                 processed.add(m)
             elif m.type == "info":
                 tmpl = processInfoOptionTemplate
-                lines.extend(codegen.makeLines(tmpl, poe))
+                lines.extend(makeProcessorLines(tmpl, poe))
                 processed.add(m)
+            elif m.isArray:
+                tmpl = processArrayOptionTemplate
+                lines.extend(makeProcessorLines(tmpl, poe))
             elif m.type == "multivalue":
                 tmpl = processMultivalueOptionTemplate
-                lines.extend(codegen.makeLines(tmpl, poe))
+                lines.extend(makeProcessorLines(tmpl, poe))
             elif m.type == "list" and o.delimiter:
                 tmpl = processMultivalueListOptionTemplate
-                lines.extend(codegen.makeLines(tmpl, poe))
+                lines.extend(makeProcessorLines(tmpl, poe))
             elif m.type == "list":
                 tmpl = processListOptionTemplate
-                lines.extend(codegen.makeLines(tmpl, poe))
+                lines.extend(makeProcessorLines(tmpl, poe))
             elif m.type != "final":
                 tmpl = processOptionTemplate
-                lines.extend(codegen.makeLines(tmpl, poe))
+                lines.extend(makeProcessorLines(tmpl, poe))
         return lines
 
-    def declareOptionProcessors(self, params, context):
-        words = []
+    def __optionProcessors(self):
+        processors = []
+        flags = set()
         for o in self._options:
             m = o.member
             if m.type in ("help", "info"):
-                for f in o.flags:
-                    words.append('OptionProcessor("%s", process_%s_option)' %
-                                 (f, m.name))
-            elif m.type not in ("final"):
-                for f in o.flags:
-                    words.append('OptionProcessor("%s", process_%s_option)' %
-                                 (f, o.name))
+                func = "process_%s_option" % m.name
+            elif m.type != "final":
+                func = "process_%s_option" % o.name
             else:
-                pass
+                continue
+            for f in o.flags:
+                if f not in flags:
+                    processors.append((f, func))
+                    flags.add(f)
+        return processors
+
+    def declareOptionProcessors(self, params, context):
+        words = ['OptionProcessor("%s", %s)' % p
+                 for p in self.__optionProcessors()]
         return codegen.join(words, 79 - context[1], ", ", ",")
 
+    def declareEnvironmentOptions(self, params, context):
+        return ['{"%s", process_%s_option, TRACKED_%s},'
+                % (name, o.name, o.member.name)
+                for name, o in self._environmentOptions]
+
+    def declareHashedOptionProcessors(self, params, context):
+        processors = dict(self.__optionProcessors())
+        return ['{"%s", %d, %s},' % (f, len(f.encode("utf-8")), processors[f])
+                for f in self.__hashSlots]
+
+    def declareOptionHashSeeds(self, params, context):
+        return codegen.join(["%du" % s for s in self.__hashSeeds],
+                            79 - context[1], ", ", ",")
+
+    def flagTrieLabels(self, params, context):
+        chars = []
+        for c in self.__flagTrie.labels:
+            if c in (ord('"'), ord("\\"), ord("?")):
+                chars.append("\\" + chr(c))
+            elif 32 <= c < 127:
+                chars.append(chr(c))
+            else:
+                chars.append("\\%03o" % c)
+        return ['"%s"' % "".join(chars[i:i + 64])
+                for i in range(0, len(chars), 64)]
+
+    def flagTrieNodes(self, params, context):
+        return ["{%d, %d, %d, %d, %d, %d}," % n
+                for n in self.__flagTrie.nodes]
+
+    def abbreviatedOptions(self, params, context):
+        return ['{"%s", %s},' % o for o in self.__flagTrie.options]
+
+    def flagTrieAmbiguities(self, params, context):
+        return ['"%s",' % s for s in self.__flagTrie.ambiguities]
+
+    def optionDispatchSwitch(self, params, context):
+        return switchDispatch(dict(self.__optionProcessors()),
+                              "flag.size()", "flag.data()", "flag")
+
+    def environmentDispatchSwitch(self, params, context):
+        return switchDispatch(dict((name, str(i)) for i, (name, o)
+                                   in enumerate(self._environmentOptions)),
+                              "size", "name", "name")
+
     def checkFinalOption(self, params, context):
         words = []
         for m in self._members:
@@ -236,9 +616,18 @@ class CppExpander(codegen.Expander):
         words = []
         for m in self._members:
             if m.isOption and m.type == "list" and m.minCount != 0:
+                if self.deferredErrors:
+                    words.extend([
+                        "if (result.%(name)s.size() < %(minCount)d)" % m,
+                        '    return error("%(flags)s", state, result, ' % m,
+                        "                 %s::ERROR_TOO_FEW_VALUES, "
+                        "%d," % (self.className, m.minCount),
+                        '                 "too few values", %s(), '
+                        'result.%s.size());' % (self.stringType, m.name)])
+                    continue
                 words.extend([
                     "if (result.%(name)s.size() < %(minCount)d)" % m,
-                    '    return error("%(flags)s", result, ' % m,
+                    '    return error("%(flags)s", state, result, ' % m,
                     '                 "too few values (received " +' % m,
                     '                 std::to_string((unsigned long long)'
                     'result.%(name)s.size()) + ", requires %(minCount)d).");'
@@ -250,20 +639,20 @@ class CppExpander(codegen.Expander):
             if a.condition or a.action:
                 return False
             m = a.member
-            return (m.valueType == "std::string" and not m.values and
+            return (m.isString and not m.values and
                     not m.condition and not m.action)
         lines = []
         for a in self._args:
             m = a.member
             poe = ProcessOptionExpander(context, self, m, a)
             if m.type == "multivalue" and (a.delimiter or not isSimple(a)):
-                lines.extend(codegen.makeLines(processMultivalueArgumentTemplate, poe))
+                lines.extend(makeProcessorLines(processMultivalueArgumentTemplate, poe))
             elif m.type == "list" and a.delimiter:
-                lines.extend(codegen.makeLines(processMultivalueListArgumentTemplate, poe))
+                lines.extend(makeProcessorLines(processMultivalueListArgumentTemplate, poe))
             elif m.type == "list" and not isSimple(a):
-                lines.extend(codegen.makeLines(processListArgumentTemplate, poe))
+                lines.extend(makeProcessorLines(processListArgumentTemplate, poe))
             elif not isSimple(a):
-                lines.extend(codegen.makeLines(processArgumentTemplate, poe))
+                lines.extend(makeProcessorLines(processArgumentTemplate, poe))
         return lines
 
     def __processArgument(self, arg):
@@ -271,7 +660,7 @@ class CppExpander(codegen.Expander):
             if a.condition or a.action:
                 return False
             m = a.member
-            return (m.valueType == "std::string" and not m.values and
+            return (m.isString and not m.values and
                     not m.condition and not m.action)
         lines = []
         a, m = arg, arg.member
@@ -284,11 +673,37 @@ class CppExpander(codegen.Expander):
         elif m.type == "value" and isSimple(a):
             lines.append("result.%s = *it++;" % m.name)
         else:
-            lines.append("if (!process_%s_argument(*it++, result))"
+            lines.append("if (!process_%s_argument(*it++, state, result))"
                          % a.name)
-            lines.append("    return result;")
+            if self.deferredErrors:
+                lines.extend(["{",
+                              "    if (autoExit)",
+                              "        exitWithError(state, result);",
+                              "    return result;",
+                              "}"])
+            else:
+                lines.append("    return result;")
         return lines
 
+    def __reserveListValues(self, arg):
+        """Reserves room for the values of the excess arguments in arg's
+        list member, they would otherwise be added one at a time.
+        """
+        m = arg.member
+        if m.type != "list":
+            return []
+        if arg.maxCount == -1:
+            count = "excess"
+        else:
+            count = "std::min<size_t>(excess, %d)" % (arg.maxCount -
+                                                      arg.minCount)
+        # Only the guaranteed number of values is reserved, reserving for
+        # the maximum would waste memory when the count is permissive.
+        if arg.delimiter and arg.minDelimiters != 0:
+            count += " * %d" % (arg.minDelimiters + 1)
+        return ["result.%s.reserve(result.%s.size() + %s);"
+                % (m.name, m.name, count)]
+
     def processArguments(self, params, context):
         lines = []
         for a in self._args:
@@ -307,6 +722,7 @@ class CppExpander(codegen.Expander):
                     if a.member.minCount == 0 and a.member.default:
                         lines.append("if (excess != 0)")
                         lines.append("    result.%(name)s.clear();" % a.member)
+                    lines.extend(self.__reserveListValues(a))
                     if a.maxCount != -1:
                         lines.append("for (size_t i = %d; excess && i < %d; ++i)"
                                      % (a.minCount, a.maxCount))
@@ -317,28 +733,34 @@ class CppExpander(codegen.Expander):
                 lines.extend(["    --excess;", "}"])
         return lines
 
-    def initializeTrackedOptions(self, params, context):
-        lines = []
-        for m in self._members:
-            if isTrackable(m):
-                lines.append("%(name)s(false)" % m)
-        return codegen.join(lines, 79 - context[1], ", ", ",")
-
     def trackedOptions(self, params, context):
-        lines = []
-        for m in self._members:
-            if isTrackable(m):
-                lines.append("bool %(name)s;" % m)
+        lines = ["TRACKED_%s," % m.name for m in self.__trackedMembers]
+        lines.append("TRACKED_OPTION_COUNT")
         return lines
 
+    def mandatoryOptionMasks(self, params, context):
+        """Returns a condition that is true if all the mandatory options'
+        bits are set.
+        """
+        masks = [0] * self.trackedWordCount
+        for i, m in enumerate(self.__trackedMembers):
+            if isMandatory(m):
+                masks[i // 64] |= 1 << (i % 64)
+        words = ["(state.tracked[%d] & 0x%XULL) == 0x%XULL" % (i, mask, mask)
+                 for i, mask in enumerate(masks) if mask]
+        return codegen.join(words, 79 - context[1], " && ", " &&")
+
     def mandatoryOptionChecks(self, params, context):
         lines = []
         for m in self._members:
             if isMandatory(m):
-                lines.append("if (!result.reserved_for_internal_use->%(name)s)"
-                             % m)
-                lines.append('    return error("%(flags)s", result, '
-                             '"missing mandatory option.");' % m)
+                lines.append("if (!state.isTracked(TRACKED_%(name)s))" % m)
+                lines.append('    return error("%s", state, result, %s'
+                             '"missing mandatory option.");'
+                             % (m.flags,
+                                errorCode(self.className,
+                                          self.deferredErrors,
+                                          "MISSING_OPTION")))
         return lines
 
     def memberConditionsAndActions(self, params, context):
@@ -346,18 +768,19 @@ class CppExpander(codegen.Expander):
         actions = []
         for m in self._members:
             if m.condition:
-                conds.append("if (result->reserved_for_internal_use->"
-                             "%(name)s &&" % m)
+                conds.append("if (state.isTracked(TRACKED_%(name)s) &&" % m)
                 conds.append("    !(%(condition)s))" % m)
                 name = m.flags if m.isOption else m.name
-                conds.append('    error("%s", *result, "%s");'
-                             % (name, m.conditionMessage))
+                conds.append('    return error("%s", state, *result, %s"%s");'
+                             % (name,
+                                errorCode(self.className,
+                                          self.deferredErrors, "CONDITION"),
+                                m.conditionMessage))
         for m in self._members:
             if m.action:
-                actions.append("if (result->reserved_for_internal_use->"
-                               "%(name)s)" % m)
-                lines.append("   %(action)s))" % m)
-        return lines + conds
+                actions.append("if (state.isTracked(TRACKED_%(name)s))" % m)
+                actions.append("    %(action)s" % m)
+        return actions + conds
 
     def customIncludes(self, params, context):
         lines = []
@@ -366,26 +789,29 @@ class CppExpander(codegen.Expander):
         return lines
 
 processMultivalueListOptionTemplate = """\
-bool process_[[[name]]]_option([[[>]]]const std::string& flag,
+bool process_[[[name]]]_option([[[>]]]const [[[stringType]]]& flag,
 [[[|]]]ArgumentIterator& argIt,
+[[[|]]][[[className]]]::State& state,
 [[[|]]][[[className]]]& result[[[<]]])
 {
 [[[IF hasDefault]]]
-    if (!result.reserved_for_internal_use->[[[memberName]]])
+    if (!state.isTracked(TRACKED_[[[memberName]]]))
     {
         result.[[[memberName]]].clear();
-        result.reserved_for_internal_use->[[[memberName]]] = true;
+        state.setTracked(TRACKED_[[[memberName]]]);
     }
+[[[ELIF isTrackable]]]
+    state.setTracked(TRACKED_[[[memberName]]]);
 [[[ENDIF]]]
 [[[IF value]]]
     [[[multivalueValueAssignment]]]
     [[[IF hasNormalOptions]]]
         [[[IF hasShortOptions]]]
-    if (!resemblesShortOption(flag.c_str()) && argIt.hasValue())
+    if (!resemblesShortOption(flag.[[[cStr]]]()) && argIt.hasValue())
         [[[ELSE]]]
     if (argIt.hasValue())
         [[[ENDIF]]]
-        return error(flag, result, "option does not take a value.");
+        return error(flag, state, result, [[[errorCode(UNEXPECTED_VALUE)]]]"option does not take a value.");
     [[[ENDIF]]]
 [[[ELSE]]]
     [[[IF hasMinOrMaxValues]]]
@@ -393,30 +819,30 @@ bool process_[[[name]]]_option([[[>]]]const std::string& flag,
     [[[ENDIF]]]
     if (!addDelimitedValues(result.[[[memberName]]], '[[[delimiter]]]', [[[IF hasValueCheck]]]
                             []([[[parameterType]]] v)
-                            {return [[[valueCheck(v)]]];},
-                            [[[ENDIF]]]flag, argIt, result))
+                            {return [[[bulkValueCheck(v)]]];},
+                            [[[ENDIF]]]flag, argIt, state, result))
         return false;
     [[[IF hasFixedNumberOfValues]]]
     if (result.[[[memberName]]].size() - prevSize != [[[minValues]]])
-        return error(flag, result, "the option value must contain [[[minValues]]] values.");
+        return error(flag, state, result, [[[errorCode(VALUE_COUNT, minValues)]]]"the option value must contain [[[minValues]]] values.");
     [[[ELSE]]]
         [[[IF hasMinValues]]]
     if (result.[[[memberName]]].size() - prevSize < [[[minValues]]])
-        return error(flag, result, "the option value must contain at least [[[minValues]]] values.");
+        return error(flag, state, result, [[[errorCode(VALUE_COUNT, minValues)]]]"the option value must contain at least [[[minValues]]] values.");
         [[[ENDIF]]]
         [[[IF hasMaxValues]]]
     if (result.[[[memberName]]].size() - prevSize > [[[maxValues]]])
-        return error(flag, result, "the option value can't contain more than [[[maxValues]]] values.");
+        return error(flag, state, result, [[[errorCode(VALUE_COUNT, maxValues)]]]"the option value can't contain more than [[[maxValues]]] values.");
         [[[ENDIF]]]
     [[[ENDIF]]]
     [[[IF hasMaxCount]]]
     if (result.[[[memberName]]].size() > [[[maxCount]]])
-        return error(flag, result, "too many values (max is [[[maxCount]]]).");
+        return error(flag, state, result, [[[errorCode(TOO_MANY_VALUES, maxCount)]]]"too many values (max is [[[maxCount]]]).");
     [[[ENDIF]]]
 [[[ENDIF]]]
 [[[IF condition]]]
     if (!([[[condition]]]))
-        return error(flag, result, "[[[conditionMessage]]]");
+        return error(flag, state, result, [[[errorCode(CONDITION)]]]"[[[conditionMessage]]]");
 [[[ENDIF]]]
     [[[action]]]
     return true;
@@ -424,42 +850,45 @@ bool process_[[[name]]]_option([[[>]]]const std::string& flag,
 """
 
 processListOptionTemplate = """\
-bool process_[[[name]]]_option([[[>]]]const std::string& flag,
+bool process_[[[name]]]_option([[[>]]]const [[[stringType]]]& flag,
 [[[|]]]ArgumentIterator& argIt,
+[[[|]]][[[className]]]::State& state,
 [[[|]]][[[className]]]& result[[[<]]])
 {
 [[[IF hasDefault]]]
-    if (!result.reserved_for_internal_use->[[[memberName]]])
+    if (!state.isTracked(TRACKED_[[[memberName]]]))
     {
         result.[[[memberName]]].clear();
-        result.reserved_for_internal_use->[[[memberName]]] = true;
+        state.setTracked(TRACKED_[[[memberName]]]);
     }
+[[[ELIF isTrackable]]]
+    state.setTracked(TRACKED_[[[memberName]]]);
 [[[ENDIF]]]
 [[[IF hasMaxCount]]]
     if (result.[[[memberName]]].size() == [[[maxCount]]])
-        return error(flag, result, "too many values (max is [[[maxCount]]]).");
+        return error(flag, state, result, [[[errorCode(TOO_MANY_VALUES, maxCount)]]]"too many values (max is [[[maxCount]]]).");
 [[[ENDIF]]]
 [[[IF value]]]
     result.[[[memberName]]].push_back([[[value]]]);
     [[[IF hasNormalOptions]]]
         [[[IF hasShortOptions]]]
-    if (!resemblesShortOption(flag.c_str()) && argIt.hasValue())
+    if (!resemblesShortOption(flag.[[[cStr]]]()) && argIt.hasValue())
         [[[ELSE]]]
     if (argIt.hasValue())
         [[[ENDIF]]]
-        return error(flag, result, "option does not take a value.");
+        return error(flag, state, result, [[[errorCode(UNEXPECTED_VALUE)]]]"option does not take a value.");
     [[[ENDIF]]]
 [[[ELSE]]]
     [[[valueType]]] value;
     if (!getValue(value, [[[IF hasValueCheck]]]
                   []([[[parameterType]]] v){return [[[valueCheck(v)]]];},
-                  [[[ENDIF]]]flag, argIt, result))
+                  [[[ENDIF]]]flag, argIt, state, result))
         return false;
     result.[[[memberName]]].push_back(value);
 [[[ENDIF]]]
 [[[IF condition]]]
     if (!([[[condition]]]))
-        return error(flag, result, "[[[conditionMessage]]]");
+        return error(flag, state, result, [[[errorCode(CONDITION)]]]"[[[conditionMessage]]]");
 [[[ENDIF]]]
     [[[action]]]
     return true;
@@ -467,47 +896,88 @@ bool process_[[[name]]]_option([[[>]]]const std::string& flag,
 """
 
 processMultivalueOptionTemplate =  """\
-bool process_[[[name]]]_option([[[>]]]const std::string& flag,
+bool process_[[[name]]]_option([[[>]]]const [[[stringType]]]& flag,
 [[[|]]]ArgumentIterator& argIt,
+[[[|]]][[[className]]]::State& state,
 [[[|]]][[[className]]]& result[[[<]]])
 {
 [[[IF isTrackable]]]
-    result.reserved_for_internal_use->[[[memberName]]] = true;
+    state.setTracked(TRACKED_[[[memberName]]]);
 [[[ENDIF]]]
     result.[[[memberName]]].clear();
 [[[IF value]]]
     [[[multivalueValueAssignment]]]
     [[[IF hasNormalOptions]]]
         [[[IF hasShortOptions]]]
-    if (!resemblesShortOption(flag.c_str()) && argIt.hasValue())
-        return error(flag, result, "option does not take a value.");
+    if (!resemblesShortOption(flag.[[[cStr]]]()) && argIt.hasValue())
+        return error(flag, state, result, [[[errorCode(UNEXPECTED_VALUE)]]]"option does not take a value.");
         [[[ELSE]]]
     if (argIt.hasValue())
-        return error(flag, result, "option does not take a value.");
+        return error(flag, state, result, [[[errorCode(UNEXPECTED_VALUE)]]]"option does not take a value.");
         [[[ENDIF]]]
     [[[ENDIF]]]
 [[[ELSE]]]
     [[[IF delimiter]]]
     if (!addDelimitedValues(result.[[[memberName]]], '[[[delimiter]]]', [[[IF hasValueCheck]]]
                             []([[[parameterType]]] v)
-                            {return [[[valueCheck(v)]]];},
-                            [[[ENDIF]]]flag, argIt, result))
+                            {return [[[bulkValueCheck(v)]]];},
+                            [[[ENDIF]]]flag, argIt, state, result))
         return false;
     if (result.[[[memberName]]].size() != [[[minValues]]])
-        return error(flag, result, "the option value must contain [[[minValues]]] "
+        return error(flag, state, result, [[[errorCode(VALUE_COUNT, minValues)]]]"the option value must contain [[[minValues]]] "
                                    "values separated by \\"[[[delimiter]]]\\".");
     [[[ELSE]]]
     [[[valueType]]] value;
     if (!getValue(value, [[[IF hasValueCheck]]]
                   []([[[parameterType]]] v){return [[[valueCheck(v)]]];},
-                  [[[ENDIF]]]flag, argIt, result))
+                  [[[ENDIF]]]flag, argIt, state, result))
         return false;
     result.[[[memberName]]].push_back(value);
     [[[ENDIF]]]
 [[[ENDIF]]]
 [[[IF condition]]]
     if (!([[[condition]]]))
-        return error(flag, result, "[[[conditionMessage]]]");
+        return error(flag, state, result, [[[errorCode(CONDITION)]]]"[[[conditionMessage]]]");
+[[[ENDIF]]]
+    [[[action]]]
+    return true;
+}
+"""
+
+processArrayOptionTemplate = """\
+bool process_[[[name]]]_option([[[>]]]const [[[stringType]]]& flag,
+[[[|]]]ArgumentIterator& argIt,
+[[[|]]][[[className]]]::State& state,
+[[[|]]][[[className]]]& result[[[<]]])
+{
+[[[IF isTrackable]]]
+    state.setTracked(TRACKED_[[[memberName]]]);
+[[[ENDIF]]]
+[[[IF value]]]
+    [[[arrayValueAssignment]]]
+    [[[IF hasNormalOptions]]]
+        [[[IF hasShortOptions]]]
+    if (!resemblesShortOption(flag.[[[cStr]]]()) && argIt.hasValue())
+        return error(flag, state, result, [[[errorCode(UNEXPECTED_VALUE)]]]"option does not take a value.");
+        [[[ELSE]]]
+    if (argIt.hasValue())
+        return error(flag, state, result, [[[errorCode(UNEXPECTED_VALUE)]]]"option does not take a value.");
+        [[[ENDIF]]]
+    [[[ENDIF]]]
+[[[ELSE]]]
+    size_t count;
+    if (!getDelimitedValues(result.[[[memberName]]], count, '[[[delimiter]]]', [[[IF hasValueCheck]]]
+                            []([[[parameterType]]] v)
+                            {return [[[bulkValueCheck(v)]]];},
+                            [[[ENDIF]]]flag, argIt, state, result))
+        return false;
+    if (count != [[[minValues]]])
+        return error(flag, state, result, [[[errorCode(VALUE_COUNT, minValues)]]]"the option value must contain [[[minValues]]] "
+                                   "values separated by \\"[[[delimiter]]]\\".");
+[[[ENDIF]]]
+[[[IF condition]]]
+    if (!([[[condition]]]))
+        return error(flag, state, result, [[[errorCode(CONDITION)]]]"[[[conditionMessage]]]");
 [[[ENDIF]]]
     [[[action]]]
     return true;
@@ -515,33 +985,34 @@ bool process_[[[name]]]_option([[[>]]]const std::string& flag,
 """
 
 processOptionTemplate = """\
-bool process_[[[name]]]_option([[[>]]]const std::string& flag,
+bool process_[[[name]]]_option([[[>]]]const [[[stringType]]]& flag,
 [[[|]]]ArgumentIterator& argIt,
+[[[|]]][[[className]]]::State& state,
 [[[|]]][[[className]]]& result[[[<]]])
 {
 [[[IF isTrackable]]]
-    result.reserved_for_internal_use->[[[memberName]]] = true;
+    state.setTracked(TRACKED_[[[memberName]]]);
 [[[ENDIF]]]
 [[[IF value]]]
     result.[[[memberName]]] = [[[value]]];
     [[[IF hasNormalOptions]]]
         [[[IF hasShortOptions]]]
-    if (!resemblesShortOption(flag.c_str()) && argIt.hasValue())
-        return error(flag, result, "option does not take a value.");
+    if (!resemblesShortOption(flag.[[[cStr]]]()) && argIt.hasValue())
+        return error(flag, state, result, [[[errorCode(UNEXPECTED_VALUE)]]]"option does not take a value.");
         [[[ELSE]]]
     if (argIt.hasValue())
-        return error(flag, result, "option does not take a value.");
+        return error(flag, state, result, [[[errorCode(UNEXPECTED_VALUE)]]]"option does not take a value.");
         [[[ENDIF]]]
     [[[ENDIF]]]
 [[[ELSE]]]
     if (!getValue(result.[[[memberName]]], [[[IF hasValueCheck]]]
                   []([[[parameterType]]] v){return [[[valueCheck(v)]]];},
-                  [[[ENDIF]]]flag, argIt, result))
+                  [[[ENDIF]]]flag, argIt, state, result))
         return false;
 [[[ENDIF]]]
 [[[IF condition]]]
     if (!([[[condition]]]))
-        return error(flag, result, "[[[conditionMessage]]]");
+        return error(flag, state, result, [[[errorCode(CONDITION)]]]"[[[conditionMessage]]]");
 [[[ENDIF]]]
     [[[action]]]
     return true;
@@ -549,16 +1020,17 @@ bool process_[[[name]]]_option([[[>]]]const std::string& flag,
 """
 
 processHelpOptionTemplate = """\
-bool process_[[[memberName]]]_option([[[>]]]const std::string& flag,
+bool process_[[[memberName]]]_option([[[>]]]const [[[stringType]]]& flag,
 [[[|]]]ArgumentIterator& argIt,
+[[[|]]][[[className]]]::State& state,
 [[[|]]][[[className]]]& result[[[<]]])
 {
-    writeHelp();
+    writeHelp(state.programName);
     result.[[[memberName]]] = true;
     result.[[[functionName]]]_result = [[[className]]]::RESULT_HELP;
 [[[IF condition]]]
     if (!([[[condition]]]))
-        return error(flag, result, "[[[conditionMessage]]]");
+        return error(flag, state, result, [[[errorCode(CONDITION)]]]"[[[conditionMessage]]]");
 [[[ENDIF]]]
     [[[action]]]
     return false;
@@ -566,15 +1038,16 @@ bool process_[[[memberName]]]_option([[[>]]]const std::string& flag,
 """
 
 processInfoOptionTemplate = """\
-bool process_[[[memberName]]]_option([[[>]]]const std::string& flag,
+bool process_[[[memberName]]]_option([[[>]]]const [[[stringType]]]& flag,
 [[[|]]]ArgumentIterator& argIt,
+[[[|]]][[[className]]]::State& state,
 [[[|]]][[[className]]]& result[[[<]]])
 {
     result.[[[memberName]]] = true;
     result.[[[functionName]]]_result = [[[className]]]::RESULT_INFO;
 [[[IF condition]]]
     if (!([[[condition]]]))
-        return error(flag, result, "[[[conditionMessage]]]");
+        return error(flag, state, result, [[[errorCode(CONDITION)]]]"[[[conditionMessage]]]");
 [[[ENDIF]]]
     [[[action]]]
     return true;
@@ -582,22 +1055,23 @@ bool process_[[[memberName]]]_option([[[>]]]const std::string& flag,
 """
 
 processArgumentTemplate = """\
-bool process_[[[name]]]_argument([[[>]]]const std::string& value,
+bool process_[[[name]]]_argument([[[>]]]const [[[stringType]]]& value,
+[[[|]]][[[className]]]::State& state,
 [[[|]]][[[className]]]& result[[[<]]])
 {
 [[[IF isStringMember]]]
     result.[[[memberName]]] = value;
 [[[ELSE]]]
     if (!fromString(value, result.[[[memberName]]]))
-        return error("[[[name]]]", result, "invalid value \\"" + value + "\\".");
+        return error("[[[name]]]", state, result, [[[valueError(INVALID_VALUE, invalid value, value)]]]);
 [[[ENDIF]]]
 [[[IF hasValueCheck]]]
     if (!([[[valueCheck]]]))
-        return error("[[[name]]]", result, "illegal value \\"" + value + "\\".");
+        return error("[[[name]]]", state, result, [[[valueError(ILLEGAL_VALUE, illegal value, value)]]]);
 [[[ENDIF]]]
 [[[IF condition]]]
     if (!([[[condition]]]))
-        return error(flag, result, "[[[conditionMessage]]]");
+        return error(flag, state, result, [[[errorCode(CONDITION)]]]"[[[conditionMessage]]]");
 [[[ENDIF]]]
     [[[action]]]
     return true;
@@ -605,28 +1079,29 @@ bool process_[[[name]]]_argument([[[>]]]const std::string& value,
 """
 
 processListArgumentTemplate = """\
-bool process_[[[name]]]_argument([[[>]]]const std::string& value,
+bool process_[[[name]]]_argument([[[>]]]const [[[stringType]]]& value,
+[[[|]]][[[className]]]::State& state,
 [[[|]]][[[className]]]& result[[[<]]])
 {
 [[[IF isStringMember]]]
     [[[IF hasValueCheck]]]
     if (!([[[valueCheck(value)]]]))
-        return error("[[[name]]]", result, "illegal value \\"" + value + "\\".");
+        return error("[[[name]]]", state, result, [[[valueError(ILLEGAL_VALUE, illegal value, value)]]]);
     [[[ENDIF]]]
     result.[[[memberName]]].push_back(value);
 [[[ELSE]]]
     [[[valueType]]] v;
     if (!fromString(value, v))
-        return error("[[[name]]]", result, "invalid value \\"" + value + "\\".");
+        return error("[[[name]]]", state, result, [[[valueError(INVALID_VALUE, invalid value, value)]]]);
     [[[IF hasValueCheck]]]
     if (!([[[valueCheck(v)]]]))
-        return error("[[[name]]]", result, "illegal value \\"" + value + "\\".");
+        return error("[[[name]]]", state, result, [[[valueError(ILLEGAL_VALUE, illegal value, value)]]]);
     [[[ENDIF]]]
     result.[[[memberName]]].push_back(v);
 [[[ENDIF]]]
 [[[IF condition]]]
     if (!([[[condition]]]))
-        return error(flag, result, "[[[conditionMessage]]]");
+        return error(flag, state, result, [[[errorCode(CONDITION)]]]"[[[conditionMessage]]]");
 [[[ENDIF]]]
     [[[action]]]
     return true;
@@ -634,7 +1109,8 @@ bool process_[[[name]]]_argument([[[>]]]const std::string& value,
 """
 
 processMultivalueArgumentTemplate = """\
-bool process_[[[name]]]_argument([[[>]]]const std::string& value,
+bool process_[[[name]]]_argument([[[>]]]const [[[stringType]]]& value,
+[[[|]]][[[className]]]::State& state,
 [[[|]]][[[className]]]& result[[[<]]])
 {
     result.[[[memberName]]].clear();
@@ -643,45 +1119,42 @@ bool process_[[[name]]]_argument([[[>]]]const std::string& value,
     while (true)
     {
         size_t last = value.find_first_of('[[[delimiter]]]', first);
-        size_t len = (last == std::string::npos ? value.size() : last) - first;
+        size_t len = (last == [[[stringType]]]::npos ? value.size() : last) - first;
     [[[IF isStringMember]]]
         [[[valueType]]] v = value.substr(first, len);
     [[[ELSE]]]
         [[[valueType]]] v;
         if (!fromString(value.substr(first, len), v))
-            return error("[[[name]]]", result, "invalid value \\""
-                         + value.substr(first, len) + "\\".");
+            return error("[[[name]]]", state, result, [[[valueError(INVALID_VALUE, invalid value, value.substr(first, len))]]]);
     [[[ENDIF]]]
     [[[IF hasValueCheck]]]
         if (!([[[valueCheck(v)]]]))
-            return error("[[[name]]]", result, "illegal value \\"" +
-                         value.substr(first, len) + "\\".");
+            return error("[[[name]]]", state, result, [[[valueError(ILLEGAL_VALUE, illegal value, value.substr(first, len))]]]);
     [[[ENDIF]]]
         result.[[[memberName]]].push_back(v);
-        if (last == std::string::npos)
+        if (last == [[[stringType]]]::npos)
             break;
         first = last + 1;
     }
     if (result.[[[memberName]]].size() != [[[minValues]]])
-        return error("[[[name]]]", result, "the argument must contain [[[minValues]]] values.");
+        return error("[[[name]]]", state, result, [[[errorCode(VALUE_COUNT, minValues)]]]"the argument must contain [[[minValues]]] values.");
 [[[ELIF isStringMember]]]
     if (!([[[valueCheck(value)]]]))
-        return error("[[[name]]]", result, "illegal value \\"" + value + "\\".");
+        return error("[[[name]]]", state, result, [[[valueError(ILLEGAL_VALUE, illegal value, value)]]]);
     result.[[[memberName]]].push_back(value);
 [[[ELSE]]]
     [[[valueType]]] v;
     if (!fromString(value, v))
-        return error("[[[name]]]", result, "invalid value \\"" + value + "\\".");
+        return error("[[[name]]]", state, result, [[[valueError(INVALID_VALUE, invalid value, value)]]]);
     [[[IF hasValueCheck]]]
         if (!([[[valueCheck(value)]]]))
-            return error("[[[name]]]", result, "illegal value \\"" +
-                         value.substr(first, last) + "\\".");
+            return error("[[[name]]]", state, result, [[[valueError(ILLEGAL_VALUE, illegal value, value.substr(first, last))]]]);
     [[[ENDIF]]]
     result.[[[memberName]]].push_back(v);
 [[[ENDIF]]]
 [[[IF condition]]]
     if (!([[[condition]]]))
-        return error(flag, result, "[[[conditionMessage]]]");
+        return error(flag, state, result, [[[errorCode(CONDITION)]]]"[[[conditionMessage]]]");
 [[[ENDIF]]]
     [[[action]]]
     return true;
@@ -689,7 +1162,8 @@ bool process_[[[name]]]_argument([[[>]]]const std::string& value,
 """
 
 processMultivalueListArgumentTemplate = """\
-bool process_[[[name]]]_argument([[[>]]]const std::string& value,
+bool process_[[[name]]]_argument([[[>]]]const [[[stringType]]]& value,
+[[[|]]][[[className]]]::State& state,
 [[[|]]][[[className]]]& result[[[<]]])
 {
 [[[IF hasMinOrMaxValues]]]
@@ -699,45 +1173,43 @@ bool process_[[[name]]]_argument([[[>]]]const std::string& value,
     while (true)
     {
         size_t last = value.find_first_of('[[[delimiter]]]', first);
-        size_t len = (last == std::string::npos ? value.size() : last) - first;
+        size_t len = (last == [[[stringType]]]::npos ? value.size() : last) - first;
 [[[IF isStringMember]]]
         [[[valueType]]] v = value.substr(first, len);
 [[[ELSE]]]
         [[[valueType]]] v;
         if (!fromString(value.substr(first, len), v))
-            return error("[[[name]]]", result, "invalid value \\""
-                         + value.substr(first, len) + "\\".");
+            return error("[[[name]]]", state, result, [[[valueError(INVALID_VALUE, invalid value, value.substr(first, len))]]]);
 [[[ENDIF]]]
 [[[IF hasValueCheck]]]
             if (!([[[valueCheck(v)]]]))
-                return error("[[[name]]]", result, "illegal value \\"" +
-                             value.substr(first, len) + "\\".");
+                return error("[[[name]]]", state, result, [[[valueError(ILLEGAL_VALUE, illegal value, value.substr(first, len))]]]);
 [[[ENDIF]]]
         result.[[[memberName]]].push_back(v);
-        if (last == std::string::npos)
+        if (last == [[[stringType]]]::npos)
             break;
         first = last + 1;
     }
 [[[IF hasFixedNumberOfValues]]]
     if (result.[[[memberName]]].size() - prevSize != [[[minValues]]])
-        return error("[[[name]]]", result, "the argument must have [[[minValues]]] values.");
+        return error("[[[name]]]", state, result, [[[errorCode(VALUE_COUNT, minValues)]]]"the argument must have [[[minValues]]] values.");
 [[[ELSE]]]
     [[[IF hasMinValues]]]
     if (result.[[[memberName]]].size() - prevSize < [[[minValues]]])
-        return error("[[[name]]]", result, "the argument must have at least [[[minValues]]] values.");
+        return error("[[[name]]]", state, result, [[[errorCode(VALUE_COUNT, minValues)]]]"the argument must have at least [[[minValues]]] values.");
     [[[ENDIF]]]
     [[[IF hasMaxValues]]]
     if (result.[[[memberName]]].size() - prevSize > [[[maxValues]]])
-        return error("[[[name]]]", result, "the argument can't have more than [[[maxValues]]] values.");
+        return error("[[[name]]]", state, result, [[[errorCode(VALUE_COUNT, maxValues)]]]"the argument can't have more than [[[maxValues]]] values.");
     [[[ENDIF]]]
 [[[ENDIF]]]
 [[[IF hasMaxCount]]]
     if (result.[[[memberName]]].size() > [[[maxCount]]])
-        return error("[[[name]]]", result, "too many values (max is [[[maxCount]]]).");
+        return error("[[[name]]]", state, result, [[[errorCode(TOO_MANY_VALUES, maxCount)]]]"too many values (max is [[[maxCount]]]).");
 [[[ENDIF]]]
 [[[IF condition]]]
     if (!([[[condition]]]))
-        return error(flag, result, "[[[conditionMessage]]]");
+        return error(flag, state, result, [[[errorCode(CONDITION)]]]"[[[conditionMessage]]]");
 [[[ENDIF]]]
     [[[action]]]
     return true;
@@ -764,12 +1236,16 @@ class ProcessOptionExpander(codegen.Expander):
         self.hasMinOrMaxValues = self.hasMinValues or self.hasMaxValues
         self.hasFixedNumberOfValues = self.minValues == self.maxValues
         self.valueType = member.valueType
-        self.isStringMember = member.valueType == "std::string"
+        self.isStringMember = member.isString
         self.parameterType = (("const %s&" if self.isStringMember else "%s")
                               % self.valueType)
         self.maxCount = member.maxCount
         self.hasMaxCount = self.maxCount != -1
         self.className = parent.className
+        self.stringView = parent.stringView
+        self.stringType = parent.stringType
+        self.cStr = parent.cStr
+        self.deferredErrors = parent.deferredErrors
         self.isMandatory = isMandatory(member)
         self.isTrackable = isTrackable(member)
         self.functionName = parent.functionName
@@ -779,6 +1255,17 @@ class ProcessOptionExpander(codegen.Expander):
         self.conditionMessage = arg.conditionMessage
 
     def valueCheck(self, params, context):
+        return self.__valueCheck(params, context, "&&", "||")
+
+    def bulkValueCheck(self, params, context):
+        """Like valueCheck, but without the short-circuit operators.
+
+        The expression has no branches, which lets the compiler vectorize
+        loops that check many values.
+        """
+        return self.__valueCheck(params, context, "&", "|")
+
+    def __valueCheck(self, params, context, andOp, orOp):
         def _cmp(operator, lhs, rhs, parens):
             # operator is either "<=" or "<"
             if operator == "<=":
@@ -788,30 +1275,62 @@ class ProcessOptionExpander(codegen.Expander):
             else:
                 return "%s < %s" % (lhs, rhs)
         var = params[0] if params else "result." + self.memberName
+        # Comparisons can't be operands of & without parentheses
+        parens = andOp != "&&"
         lines = []
         for lo, hi, loCmp, hiCmp in self.member.values:
             if lo == hi:
                 lines.append("(%s == %s)" % (var, lo))
             elif lo and hi:
-                lines.append("(%s && %s)" % (_cmp(loCmp, lo, var, False),
-                                             _cmp(hiCmp, var, hi, False)))
+                lines.append("(%s %s %s)" % (_cmp(loCmp, lo, var, parens),
+                                             andOp,
+                                             _cmp(hiCmp, var, hi, parens)))
             elif lo:
                 lines.append(_cmp(loCmp, lo, var, True))
             elif hi:
                 lines.append(_cmp(hiCmp, var, hi, True))
         if lines:
-            return codegen.join(lines, 76 - context[1], " || ", " ||")
+            return codegen.join(lines, 76 - context[1], " %s " % orOp,
+                                " " + orOp)
         else:
             return "true"
 
+    def toStdString(self, params, context):
+        return toStdString(self.stringView, ", ".join(params))
+
+    def errorCode(self, params, context):
+        """errorCode(code[, name of limit attribute])
+        """
+        limit = "0"
+        if len(params) > 1:
+            limit = str(self.__getattribute__(params[1].strip()))
+        return errorCode(self.className, self.deferredErrors, params[0],
+                         limit)
+
+    def valueError(self, params, context):
+        return valueError(self.className, self.deferredErrors,
+                          self.stringView, params[0], params[1].strip(),
+                          ", ".join(p.strip() for p in params[2:]))
+
     def multivalueValueAssignment(self, params, context):
         s = "result.%s.push_back(%%s);" % self.member.name
         return [s % v for v in self.value.split("|")]
 
-def createFile(fileName, text, opts, args, members, **kw):
-    cppFile = os.path.join(os.path.dirname(__file__), "cpp_template.txt")
-    cppTemplate = open(cppFile).read()
+    def arrayValueAssignment(self, params, context):
+        s = "result.%s[%%d] = %%s;" % self.member.name
+        return [s % (i, v) for i, v in enumerate(self.value.split("|"))]
+
+def templateFileName():
+    return os.path.join(os.path.dirname(__file__), "cpp_template.txt")
+
+@profiling.profiled("argparser_cpp.createFile")
+def createFile(fileName, text, opts, args, members, onlyIfChanged=False,
+               **kw):
+    cppTemplate = open(templateFileName()).read()
     kw["fileName"] = fileName
-    open(fileName, "w").write(codegen.makeText(
-            cppTemplate,
-            CppExpander(text, opts, args, members, **kw)))
+    return codegen.writeFile(fileName,
+                             codegen.makeText(
+                                     cppTemplate,
+                                     CppExpander(text, opts, args, members,
+                                                 **kw)),
+                             onlyIfChanged)
@@ -1,23 +1,24 @@
 import codegen
 import os
+import profiling
 
 class HppExpander(codegen.Expander):
     def __init__(self, members, className="Arguments",
                  fileName="ParseArguments.hpp",
-                 functionName="parseArguments", namespace=""):
+                 functionName="parseArguments", namespace="",
+                 deferredErrors=False, responseFileDepth=0,
+                 abbreviations=False, stream=False, stringView=False):
         codegen.Expander.__init__(self)
         self.className = className
         self.includeGuard = codegen.makeMacroName(fileName)
         self.functionName = functionName
         self.namespace = [s for s in namespace.split("::") if s]
         self.hasInfoOptions = any(m for m in members if m.type == "info")
-        def isTrackable(m):
-            return ((m.isOption and
-                     (m.count == (1, 1)) or
-                     (m.type == "list" and m.default)) or
-                    (m.action) or
-                    (m.condition))
-        self.hasTrackedOptions = any(m for m in members if isTrackable(m))
+        self.deferredErrors = deferredErrors
+        self.responseFiles = responseFileDepth > 0
+        self.abbreviations = abbreviations
+        self.stream = stream
+        self.ownsResponseFiles = self.responseFiles and stringView
         self._members = members
 
     def members(self, params, context):
@@ -30,21 +31,36 @@ class HppExpander(codegen.Expander):
                     args = ", ".join(a.name for a in m.arguments)
                     lines.append("/** @brief Member for arguments: " + args)
                 lines.append("  */")
-                lines.append("%(memberType)s %(name)s;" % m)
+                lines.append(str(m))
         return lines
 
     def hasVectorMembers(self, params, context):
+        if self.ownsResponseFiles:
+            return True
         for m in self._members:
-            if m.type in ("list", "multivalue"):
+            if m.type in ("list", "multivalue") and not m.isArray:
                 return True
         return False
 
+    def hasArrayMembers(self, params, context):
+        return any(m for m in self._members if m.isArray)
+
     def hasStringMembers(self, params, context):
+        if self.deferredErrors:
+            return True
         for m in self._members:
             if m.valueType == "std::string":
                 return True
         return False
 
+    def hasStringViewMembers(self, params, context):
+        if self.deferredErrors:
+            return True
+        for m in self._members:
+            if m.valueType == "std::string_view":
+                return True
+        return False
+
     def beginNamespace(self, params, context):
         if not self.namespace:
             return ""
@@ -60,9 +76,14 @@ class HppExpander(codegen.Expander):
             lines.append("#include " + inc)
         return lines
 
-def createFile(fileName, members, **kw):
-    hppFile = os.path.join(os.path.dirname(__file__), "hpp_template.txt")
-    hppTemplate = open(hppFile).read()
+def templateFileName():
+    return os.path.join(os.path.dirname(__file__), "hpp_template.txt")
+
+@profiling.profiled("argparser_hpp.createFile")
+def createFile(fileName, members, onlyIfChanged=False, **kw):
+    hppTemplate = open(templateFileName()).read()
     kw["fileName"] = fileName
-    open(fileName, "w").write(codegen.makeText(hppTemplate,
-                                               HppExpander(members, **kw)))
+    return codegen.writeFile(fileName,
+                             codegen.makeText(hppTemplate,
+                                              HppExpander(members, **kw)),
+                             onlyIfChanged)
@@ -0,0 +1,822 @@
+import codegen
+import constants
+import dispatch
+import os
+import profiling
+import re
+from argparser_cpp import CppExpander, isMandatory, isTrackable
+from error import Error
+
+# The ranges of the integer types, the sizes are those of the LP64 data
+# model used by Linux and Mac OS X.
+IntegerRanges = {
+    16: ("short", "short int", "int16_t", "std::int16_t"),
+    -16: ("unsigned short", "unsigned short int", "uint16_t",
+          "std::uint16_t"),
+    32: ("int", "signed", "int32_t", "std::int32_t"),
+    -32: ("unsigned", "unsigned int", "uint32_t", "std::uint32_t"),
+    64: ("long", "long int", "long long", "long long int", "ptrdiff_t",
+         "intmax_t", "int64_t", "std::ptrdiff_t", "std::intmax_t",
+         "std::int64_t"),
+    -64: ("unsigned long", "unsigned long int", "unsigned long long",
+          "unsigned long long int", "size_t", "uintmax_t", "uint64_t",
+          "std::size_t", "std::uintmax_t", "std::uint64_t")
+}
+IntegerBits = dict((t, bits) for bits in IntegerRanges
+                   for t in IntegerRanges[bits])
+
+def integerRange(bits):
+    """integerRange(bits) -> (min, max)
+
+    Negative bits denote unsigned types like in IntegerBits.
+    """
+    if bits < 0:
+        return 0, 2 ** -bits - 1
+    return -2 ** (bits - 1), 2 ** (bits - 1) - 1
+
+# The limits of the IEEE 754 single and double precision types.
+FloatLimits = {
+    "float": ("1.1754943508222875e-38", "3.4028234663852886e+38"),
+    "double": ("2.2250738585072014e-308", "1.7976931348623157e+308")
+}
+
+NumericLimitRegex = re.compile(
+        r"^(?:std::)?numeric_limits\s*<\s*([\w: ]+?)\s*>\s*::\s*"
+        r"(min|max|lowest)\s*\(\s*\)$")
+
+def pyString(s):
+    """pyString(string) -> Python string literal
+    """
+    return '"%s"' % (s.replace("\\", r"\\").replace('"', r'\"')
+                      .replace("\n", r"\n").replace("\t", r"\t"))
+
+def pyStringLines(s):
+    """pyStringLines(string) -> list of Python string literals
+
+    Splits s at the newlines and returns the lines as Python string
+    literals that together make up s.
+    """
+    parts = s.split("\n")
+    lines = [pyString(p + "\n") for p in parts[:-1]]
+    if parts[-1] or not lines:
+        lines.append(pyString(parts[-1]))
+    return lines
+
+def pyNumericLimit(value):
+    """pyNumericLimit(C++ expression) -> Python literal or None
+
+    Translates std::numeric_limits<T>::min(), max() and lowest() for the
+    integer types in IntegerBits and for float and double.
+    """
+    match = NumericLimitRegex.match(value)
+    if not match:
+        return None
+    valueType, limit = match.groups()
+    valueType = " ".join(valueType.split())
+    if valueType in IntegerBits:
+        lo, hi = integerRange(IntegerBits[valueType])
+        return str(hi if limit == "max" else lo)
+    elif valueType in FloatLimits:
+        lo, hi = FloatLimits[valueType]
+        return {"min": lo, "max": hi, "lowest": "-" + hi}[limit]
+    return None
+
+def pyLiteral(value, lineNo=""):
+    """pyLiteral(C++ literal) -> Python literal
+
+    Translates the bool, number and string literals used as default
+    values, option values and in the values property, as well as the
+    numeric_limits of the common number types.
+    """
+    value = value.strip()
+    limit = pyNumericLimit(value)
+    if limit is not None:
+        return limit
+    if value in ("true", "false"):
+        return value.capitalize()
+    elif len(value) >= 2 and value[0] == value[-1] == '"':
+        return value
+    number = value
+    if not value.lstrip("+-").lower().startswith("0x"):
+        number = value.rstrip("uUlLfF")
+    try:
+        float(number)
+        digits = number.lstrip("+-")
+        if len(digits) > 1 and digits[0] == "0" and digits.isdigit():
+            return str(int(number, 8))
+        return number
+    except ValueError:
+        pass
+    try:
+        int(number, 16)
+        return number
+    except ValueError:
+        raise Error("can't translate %s to Python." % value, lineNo)
+
+def pyCode(code, mode, lineNo=""):
+    """pyCode(C++ code, "eval" or "exec") -> list of lines of Python code
+
+    Translates the C++ expression in a condition ("eval") or the
+    statements in an action ("exec"). Only the operators, literals and
+    member references that Python and C++ have in common are supported.
+    """
+    statements = []
+    text = []
+    i = 0
+    while i < len(code):
+        c = code[i]
+        if c in "\"'":
+            end = i + 1
+            while end < len(code) and code[end] != c:
+                end += 2 if code[end] == "\\" else 1
+            text.append(code[i:end + 1])
+            i = end + 1
+        elif code.startswith("&&", i) or code.startswith("||", i):
+            while text and text[-1].isspace():
+                text.pop()
+            text.append(" and " if c == "&" else " or ")
+            i += 2
+            while i < len(code) and code[i].isspace():
+                i += 1
+        elif code.startswith("->", i):
+            text.append(".")
+            i += 2
+        elif c == "!" and not code.startswith("!=", i):
+            text.append("not ")
+            i += 1
+        elif c.isalpha() or c == "_":
+            end = i
+            while end < len(code) and (code[end].isalnum() or
+                                       code[end] == "_"):
+                end += 1
+            word = code[i:end]
+            if word in ("true", "false"):
+                word = word.capitalize()
+            text.append(word)
+            i = end
+        elif c == ";" and mode == "exec":
+            statements.append("".join(text).strip())
+            text = []
+            i += 1
+        else:
+            text.append(c)
+            i += 1
+    statements.append("".join(text).strip())
+    lines = [s for s in statements if s]
+    try:
+        compile("\n".join(lines), "<%s>" % code, mode)
+    except SyntaxError:
+        raise Error("can't translate %s to Python." % code, lineNo)
+    return lines
+
+class PyExpander(CppExpander):
+    """Generates a Python module that parses the command line the same way
+    as the C++ code.
+
+    Inherits the properties of the options and arguments that are common
+    to both languages from CppExpander.
+    """
+    def __init__(self, text, opts, args, members,
+                 className="ParseArguments", fileName="ParseArguments.py",
+                 functionName="parseArguments", includeTest=True,
+                 abbreviations=False):
+        CppExpander.__init__(self, text, opts, args, members,
+                             className=className, fileName=fileName,
+                             functionName=functionName,
+                             includeTest=includeTest,
+                             abbreviations=abbreviations)
+        if self.abbreviations:
+            self.__abbreviations = dispatch.abbreviations(
+                    self._longFlags, self.minAbbreviationLength)
+            self.hasAmbiguousAbbreviations = bool(self.__abbreviations[1])
+        self.__helpText = text + "\n"
+        self.__converters = {}
+        for m in members:
+            if m.type not in ("help", "info", "final"):
+                self.__converters[m.name] = self.__converter(m)
+        converters = set(self.__converters.values())
+        self.hasIntConversion = any(c for c in converters if "Int" in c)
+        self.hasFloatConversion = "_toFloat" in converters
+        self.hasBoolConversion = "_toBool" in converters
+        self.hasNumberConversion = (self.hasIntConversion or
+                                    self.hasFloatConversion)
+        kinds = [(o, optionKind(o)) for o in self._options]
+        self.hasValueOptions = any(
+                o for o, kind in kinds if not o.value and
+                (kind in ("value", "list") or
+                 (kind == "multivalue" and not o.delimiter)))
+        self.hasDelimitedOptions = any(
+                o for o, kind in kinds if not o.value and
+                (kind == "delimitedList" or
+                 (kind == "multivalue" and o.delimiter)))
+        self.hasDelimitedArguments = any(
+                a for a in args if a.delimiter and
+                a.member.type in ("list", "multivalue"))
+        self.requiresNextValue = self.hasValueOptions or self.hasFinalOption
+        self.hasDelimitedValues = self.hasDelimitedOptions
+        if self.hasNormalOptions:
+            self.unknownOptionCheck = "_resemblesOption"
+        elif self.hasShortOptions:
+            self.unknownOptionCheck = "_resemblesShortOption"
+        else:
+            self.unknownOptionCheck = ""
+
+    def __converter(self, member):
+        """Returns the name of the function that converts the values of
+        member from strings.
+        """
+        if member.isString:
+            return "str"
+        elif member.valueType == "bool":
+            return "_toBool"
+        elif member.valueType in constants.FloatingPointValueTypes:
+            return "_toFloat"
+        elif member.valueType in IntegerBits:
+            bits = IntegerBits[member.valueType]
+            return "_to%sInt%d" % ("U" if bits < 0 else "", abs(bits))
+        raise Error("%s: values of type %s can't be converted in Python."
+                    % (member.name, member.valueType), member.lineNo)
+
+    def convert(self, member):
+        return self.__converters[member.name]
+
+    def intConverters(self, params, context):
+        lines = []
+        for c in sorted(set(c for c in self.__converters.values()
+                            if "Int" in c)):
+            bits = int(c[c.index("Int") + 3:])
+            lo, hi = integerRange(-bits if c.startswith("_toU") else bits)
+            lines.extend(["def %s(s):" % c,
+                          "    return _toInt(s, %d, %d)" % (lo, hi),
+                          ""])
+        return lines
+
+    def zeroValue(self, member):
+        """Returns the value a member gets if it has no default value.
+        """
+        converter = self.__converters.get(member.name, "_toBool")
+        if converter == "str":
+            return '""'
+        elif converter == "_toBool":
+            return "False"
+        elif converter == "_toFloat":
+            return "0.0"
+        else:
+            return "0"
+
+    def helpTextSegments(self, params, context):
+        lines = []
+        for segment in self.__helpText.split("$prog$"):
+            strings = pyStringLines(segment)
+            strings[-1] += ","
+            lines.extend(strings)
+        return lines
+
+    def slots(self, params, context):
+        words = ['"%s"' % m.name for m in self._members if m.type != "final"]
+        words.append('"%s_result"' % self.functionName)
+        return codegen.join(words, 78 - context[1], ", ", ",")
+
+    def memberInitializers(self, params, context):
+        lines = []
+        for m in self._members:
+            if m.type == "final":
+                continue
+            if m.type in ("list", "multivalue"):
+                if m.minCount != 0:
+                    value = "[]"
+                elif m.default:
+                    value = "[%s]" % ", ".join(
+                            pyLiteral(v, m.lineNo) if v else self.zeroValue(m)
+                            for v in m.default.split("|"))
+                elif m.type == "multivalue":
+                    value = "[%s] * %d" % (self.zeroValue(m), m.maxCount)
+                else:
+                    value = "[]"
+            elif m.default:
+                value = pyLiteral(m.default, m.lineNo)
+            else:
+                value = self.zeroValue(m)
+            lines.append("self.%s = %s" % (m.name, value))
+        return lines
+
+    def valueChecks(self, params, context):
+        lines = []
+        for m in self._members:
+            if not m.values:
+                continue
+            words = []
+            for lo, hi, loCmp, hiCmp in m.values:
+                if lo:
+                    lo = pyLiteral(lo, m.lineNo)
+                if hi:
+                    hi = pyLiteral(hi, m.lineNo)
+                if lo == hi:
+                    words.append("v == %s" % lo)
+                elif lo and hi:
+                    words.append("%s %s v %s %s" % (lo, loCmp, hiCmp, hi))
+                elif lo:
+                    words.append("%s %s v" % (lo, loCmp))
+                else:
+                    words.append("v %s %s" % (hiCmp, hi))
+            lines.append("def _check_%s(v):" % m.name)
+            if len(words) == 1:
+                lines.append("    return " + words[0])
+            else:
+                words = codegen.join(words, 67, " or ", " or")
+                lines.append("    return (" + words[0])
+                lines.extend("            " + w for w in words[1:])
+                lines[-1] += ")"
+            lines.append("")
+        return lines
+
+    def optionProcessors(self, params, context):
+        lines = []
+        processed = set()
+        for o in self._options:
+            m = o.member
+            kind = optionKind(o)
+            if m in processed or kind == "final":
+                continue
+            if kind in ("help", "info"):
+                processed.add(m)
+            poe = ProcessPyOptionExpander(context, self, m, o)
+            lines.extend(codegen.makeLines(optionTemplates[kind], poe))
+        return lines
+
+    def __optionProcessorName(self, option):
+        if option.member.type in ("help", "info"):
+            return "_process_%s_option" % option.member.name
+        return "_process_%s_option" % option.name
+
+    def environmentOptionTable(self, params, context):
+        return ["(%s, %s, %s)," % (pyString(name), pyString(o.member.name),
+                                   self.__optionProcessorName(o))
+                for name, o in self._environmentOptions]
+
+    def optionProcessorTable(self, params, context):
+        lines = []
+        flags = set()
+        for o in self._options:
+            if o.member.type == "final":
+                continue
+            for f in o.flags:
+                if f not in flags:
+                    lines.append("%s: %s," % (pyString(f),
+                                              self.__optionProcessorName(o)))
+                    flags.add(f)
+        return lines
+
+    def abbreviationTable(self, params, context):
+        unique = self.__abbreviations[0]
+        return ["%s: %s," % (pyString(k), pyString(unique[k]))
+                for k in sorted(unique)]
+
+    def ambiguousAbbreviationTable(self, params, context):
+        ambiguous = self.__abbreviations[1]
+        return ["%s: %s," % (pyString(k), pyString(ambiguous[k]))
+                for k in sorted(ambiguous)]
+
+    def finalFlags(self, params, context):
+        flags = []
+        for m in self._members:
+            if m.type == "final":
+                for a in m.arguments:
+                    flags.extend(pyString(f) for f in a.flags)
+        return "[%s]" % ", ".join(flags)
+
+    def argumentProcessors(self, params, context):
+        lines = []
+        for a in self._args:
+            if isInlineArgument(a):
+                continue
+            m = a.member
+            if m.type == "multivalue":
+                tmpl = processMultivalueArgumentTemplate
+            elif m.type == "list" and a.delimiter:
+                tmpl = processMultivalueListArgumentTemplate
+            elif m.type == "list":
+                tmpl = processListArgumentTemplate
+            else:
+                tmpl = processArgumentTemplate
+            poe = ProcessPyOptionExpander(context, self, m, a)
+            lines.extend(codegen.makeLines(tmpl, poe))
+        return lines
+
+    def __processArgument(self, arg):
+        m = arg.member
+        if isInlineArgument(arg) and m.type == "list":
+            return ["result.%s.append(next(it))" % m.name]
+        elif isInlineArgument(arg):
+            return ["result.%s = next(it)" % m.name]
+        else:
+            return ["_process_%s_argument(next(it), result)" % arg.name]
+
+    def processArguments(self, params, context):
+        lines = []
+        for a in self._args:
+            if a.minCount == 1:
+                lines.extend(self.__processArgument(a))
+            elif a.minCount > 1:
+                lines.append("for _ in range(%d):" % a.minCount)
+                lines.extend("    " + s for s in self.__processArgument(a))
+
+            if a.minCount != a.maxCount:
+                if a.maxCount - a.minCount == 1:
+                    lines.append("if excess != 0:")
+                else:
+                    if a.member.minCount == 0 and a.member.default:
+                        lines.append("if excess != 0:")
+                        lines.append("    result.%s = []" % a.member.name)
+                    if a.maxCount != -1:
+                        lines.append("for _ in range(min(excess, %d)):"
+                                     % (a.maxCount - a.minCount))
+                    else:
+                        lines.append("while excess:")
+                lines.extend("    " + s for s in self.__processArgument(a))
+                lines.append("    excess -= 1")
+        return lines
+
+    def mandatoryOptionChecks(self, params, context):
+        lines = []
+        for m in self._members:
+            if isMandatory(m):
+                lines.append('if "%s" not in state.tracked:' % m.name)
+                lines.append("    raise _ArgumentError(%s," % pyString(m.flags))
+                lines.append('                         "missing mandatory '
+                             'option.")')
+        return lines
+
+    def listLengthChecks(self, params, context):
+        lines = []
+        for m in self._members:
+            if m.isOption and m.type == "list" and m.minCount != 0:
+                lines.extend([
+                    "if len(result.%s) < %d:" % (m.name, m.minCount),
+                    "    raise _ArgumentError(%s," % pyString(m.flags),
+                    '                         "too few values (received %%d, '
+                    'requires %d)."' % m.minCount,
+                    "                         %% len(result.%s))" % m.name])
+        return lines
+
+    def memberActions(self, params, context):
+        lines = []
+        for m in self._members:
+            if m.action:
+                lines.append('if "%s" in state.tracked:' % m.name)
+                lines.extend("    " + s
+                             for s in pyCode(m.action, "exec", m.lineNo))
+        return lines
+
+    def memberConditions(self, params, context):
+        lines = []
+        for m in self._members:
+            if m.condition:
+                lines.append('if "%s" in state.tracked and not (%s):'
+                             % (m.name,
+                                pyCode(m.condition, "eval", m.lineNo)[0]))
+                lines.append("    raise _ArgumentError(%s, %s)"
+                             % (pyString(m.flags if m.isOption else m.name),
+                                pyString(m.conditionMessage)))
+        return lines
+
+def optionKind(option):
+    """Returns the name of the template that processes option.
+    """
+    m = option.member
+    if m.type in ("help", "info", "multivalue", "final"):
+        return m.type
+    elif m.type == "list" and option.delimiter:
+        return "delimitedList"
+    elif m.type == "list":
+        return "list"
+    return "value"
+
+def isInlineArgument(arg):
+    """True if arg's values are stored as they are, without conversion,
+    splitting or checks.
+    """
+    m = arg.member
+    return (m.type in ("value", "list") and not arg.delimiter and
+            not arg.condition and not arg.action and m.isString and
+            not m.values and not m.condition and not m.action)
+
+noValueCheckTemplate = """\
+[[[IF hasNormalOptions]]]
+    [[[IF hasShortOptions]]]
+if not _resemblesShortOption(flag) and argIt.hasValue():
+    [[[ELSE]]]
+if argIt.hasValue():
+    [[[ENDIF]]]
+    raise _ArgumentError(flag, "option does not take a value.")
+[[[ENDIF]]]
+"""
+
+conditionAndActionTemplate = """\
+[[[IF condition]]]
+if not ([[[condition]]]):
+    raise _ArgumentError([[[errorName]]], [[[conditionMessage]]])
+[[[ENDIF]]]
+[[[action]]]
+"""
+
+processOptionTemplate = """\
+def _process_[[[name]]]_option(flag, argIt, state):
+    result = state.result
+[[[IF isTrackable]]]
+    state.tracked.add("[[[memberName]]]")
+[[[ENDIF]]]
+[[[IF value]]]
+    result.[[[memberName]]] = [[[value]]]
+    [[[noValueCheck]]]
+[[[ELSE]]]
+    result.[[[memberName]]] = _getValue(flag, argIt, [[[convert]]][[[checkArgument]]])
+[[[ENDIF]]]
+    [[[conditionAndAction]]]
+    return True
+"""
+
+processListOptionTemplate = """\
+def _process_[[[name]]]_option(flag, argIt, state):
+    result = state.result
+[[[IF hasDefault]]]
+    if "[[[memberName]]]" not in state.tracked:
+        result.[[[memberName]]] = []
+        state.tracked.add("[[[memberName]]]")
+[[[ELIF isTrackable]]]
+    state.tracked.add("[[[memberName]]]")
+[[[ENDIF]]]
+[[[IF hasMaxCount]]]
+    if len(result.[[[memberName]]]) == [[[maxCount]]]:
+        raise _ArgumentError(flag, "too many values (max is [[[maxCount]]]).")
+[[[ENDIF]]]
+[[[IF value]]]
+    result.[[[memberName]]].append([[[value]]])
+    [[[noValueCheck]]]
+[[[ELSE]]]
+    result.[[[memberName]]].append(_getValue(flag, argIt, [[[convert]]][[[checkArgument]]]))
+[[[ENDIF]]]
+    [[[conditionAndAction]]]
+    return True
+"""
+
+processDelimitedListOptionTemplate = """\
+def _process_[[[name]]]_option(flag, argIt, state):
+    result = state.result
+[[[IF hasDefault]]]
+    if "[[[memberName]]]" not in state.tracked:
+        result.[[[memberName]]] = []
+        state.tracked.add("[[[memberName]]]")
+[[[ELIF isTrackable]]]
+    state.tracked.add("[[[memberName]]]")
+[[[ENDIF]]]
+[[[IF value]]]
+    result.[[[memberName]]].extend([[[values]]])
+    [[[noValueCheck]]]
+[[[ELSE]]]
+    [[[IF hasMinOrMaxValues]]]
+    prevSize = len(result.[[[memberName]]])
+    [[[ENDIF]]]
+    _addDelimitedValues(result.[[[memberName]]], [[[delimiterString]]], [[[convert]]],
+                        [[[check]]], flag, argIt)
+    [[[IF hasFixedNumberOfValues]]]
+    if len(result.[[[memberName]]]) - prevSize != [[[minValues]]]:
+        raise _ArgumentError(flag, "the option value must contain "
+                                   "[[[minValues]]] values.")
+    [[[ELSE]]]
+        [[[IF hasMinValues]]]
+    if len(result.[[[memberName]]]) - prevSize < [[[minValues]]]:
+        raise _ArgumentError(flag, "the option value must contain at "
+                                   "least [[[minValues]]] values.")
+        [[[ENDIF]]]
+        [[[IF hasMaxValues]]]
+    if len(result.[[[memberName]]]) - prevSize > [[[maxValues]]]:
+        raise _ArgumentError(flag, "the option value can't contain more "
+                                   "than [[[maxValues]]] values.")
+        [[[ENDIF]]]
+    [[[ENDIF]]]
+    [[[IF hasMaxCount]]]
+    if len(result.[[[memberName]]]) > [[[maxCount]]]:
+        raise _ArgumentError(flag, "too many values (max is [[[maxCount]]]).")
+    [[[ENDIF]]]
+[[[ENDIF]]]
+    [[[conditionAndAction]]]
+    return True
+"""
+
+processMultivalueOptionTemplate = """\
+def _process_[[[name]]]_option(flag, argIt, state):
+    result = state.result
+[[[IF isTrackable]]]
+    state.tracked.add("[[[memberName]]]")
+[[[ENDIF]]]
+[[[IF value]]]
+    result.[[[memberName]]] = [[[values]]]
+    [[[noValueCheck]]]
+[[[ELIF delimiter]]]
+    result.[[[memberName]]] = []
+    _addDelimitedValues(result.[[[memberName]]], [[[delimiterString]]], [[[convert]]],
+                        [[[check]]], flag, argIt)
+    if len(result.[[[memberName]]]) != [[[minValues]]]:
+        raise _ArgumentError(flag, [[[separatedValuesMessage]]])
+[[[ELSE]]]
+    result.[[[memberName]]] = [_getValue(flag, argIt, [[[convert]]][[[checkArgument]]])]
+[[[ENDIF]]]
+    [[[conditionAndAction]]]
+    return True
+"""
+
+processHelpOptionTemplate = """\
+def _process_[[[memberName]]]_option(flag, argIt, state):
+    result = state.result
+    _writeHelp(state.programName)
+    result.[[[memberName]]] = True
+    result.[[[functionName]]]_result = [[[className]]].RESULT_HELP
+    [[[conditionAndAction]]]
+    return False
+"""
+
+processInfoOptionTemplate = """\
+def _process_[[[memberName]]]_option(flag, argIt, state):
+    result = state.result
+    result.[[[memberName]]] = True
+    result.[[[functionName]]]_result = [[[className]]].RESULT_INFO
+    [[[conditionAndAction]]]
+    return True
+"""
+
+optionTemplates = {
+    "value": processOptionTemplate,
+    "list": processListOptionTemplate,
+    "delimitedList": processDelimitedListOptionTemplate,
+    "multivalue": processMultivalueOptionTemplate,
+    "help": processHelpOptionTemplate,
+    "info": processInfoOptionTemplate
+}
+
+processArgumentTemplate = """\
+def _process_[[[name]]]_argument(value, result):
+[[[IF isStringMember]]]
+    result.[[[memberName]]] = value
+[[[ELSE]]]
+    try:
+        result.[[[memberName]]] = [[[convert]]](value)
+    except ValueError:
+        raise _ArgumentError("[[[name]]]", 'invalid value "%s".' % value)
+[[[ENDIF]]]
+[[[IF hasValueCheck]]]
+    if not [[[check]]](result.[[[memberName]]]):
+        raise _ArgumentError("[[[name]]]", 'illegal value "%s".' % value)
+[[[ENDIF]]]
+    [[[conditionAndAction]]]
+"""
+
+processListArgumentTemplate = """\
+def _process_[[[name]]]_argument(value, result):
+[[[IF isStringMember]]]
+    [[[IF hasValueCheck]]]
+    if not [[[check]]](value):
+        raise _ArgumentError("[[[name]]]", 'illegal value "%s".' % value)
+    [[[ENDIF]]]
+    result.[[[memberName]]].append(value)
+[[[ELSE]]]
+    try:
+        v = [[[convert]]](value)
+    except ValueError:
+        raise _ArgumentError("[[[name]]]", 'invalid value "%s".' % value)
+    [[[IF hasValueCheck]]]
+    if not [[[check]]](v):
+        raise _ArgumentError("[[[name]]]", 'illegal value "%s".' % value)
+    [[[ENDIF]]]
+    result.[[[memberName]]].append(v)
+[[[ENDIF]]]
+    [[[conditionAndAction]]]
+"""
+
+processMultivalueArgumentTemplate = """\
+def _process_[[[name]]]_argument(value, result):
+[[[IF delimiter]]]
+    result.[[[memberName]]] = _splitValues(value, [[[delimiterString]]], [[[convert]]],
+                                           [[[check]]], "[[[name]]]")
+    if len(result.[[[memberName]]]) != [[[minValues]]]:
+        raise _ArgumentError("[[[name]]]", "the argument must contain "
+                                           "[[[minValues]]] values.")
+[[[ELIF isStringMember]]]
+    [[[IF hasValueCheck]]]
+    if not [[[check]]](value):
+        raise _ArgumentError("[[[name]]]", 'illegal value "%s".' % value)
+    [[[ENDIF]]]
+    result.[[[memberName]]] = [value]
+[[[ELSE]]]
+    try:
+        v = [[[convert]]](value)
+    except ValueError:
+        raise _ArgumentError("[[[name]]]", 'invalid value "%s".' % value)
+    [[[IF hasValueCheck]]]
+    if not [[[check]]](v):
+        raise _ArgumentError("[[[name]]]", 'illegal value "%s".' % value)
+    [[[ENDIF]]]
+    result.[[[memberName]]] = [v]
+[[[ENDIF]]]
+    [[[conditionAndAction]]]
+"""
+
+processMultivalueListArgumentTemplate = """\
+def _process_[[[name]]]_argument(value, result):
+    values = _splitValues(value, [[[delimiterString]]], [[[convert]]], [[[check]]],
+                          "[[[name]]]")
+[[[IF hasFixedNumberOfValues]]]
+    if len(values) != [[[minValues]]]:
+        raise _ArgumentError("[[[name]]]", "the argument must have "
+                                           "[[[minValues]]] values.")
+[[[ELSE]]]
+    [[[IF hasMinValues]]]
+    if len(values) < [[[minValues]]]:
+        raise _ArgumentError("[[[name]]]", "the argument must have at "
+                                           "least [[[minValues]]] values.")
+    [[[ENDIF]]]
+    [[[IF hasMaxValues]]]
+    if len(values) > [[[maxValues]]]:
+        raise _ArgumentError("[[[name]]]", "the argument can't have more "
+                                           "than [[[maxValues]]] values.")
+    [[[ENDIF]]]
+[[[ENDIF]]]
+    result.[[[memberName]]].extend(values)
+[[[IF hasMaxCount]]]
+    if len(result.[[[memberName]]]) > [[[maxCount]]]:
+        raise _ArgumentError("[[[name]]]", "too many values (max is "
+                                           "[[[maxCount]]]).")
+[[[ENDIF]]]
+    [[[conditionAndAction]]]
+"""
+
+class ProcessPyOptionExpander(codegen.Expander):
+    def __init__(self, context, parent, member, arg):
+        codegen.Expander.__init__(self, context)
+        self.member = member
+        self.memberName = member.name
+        self.name = arg.name
+        self.errorName = "flag" if arg.flags else pyString(arg.name)
+        self.hasShortOptions = (parent.hasShortOptions and arg.flags and
+                any(f for f in arg.flags if len(f) == 2 and f[0] in "-/"))
+        self.hasNormalOptions = (parent.hasNormalOptions and arg.flags and
+                any(f for f in arg.flags if len(f) > 2 and f[:2] == '--'))
+        self.value = None
+        self.values = None
+        if arg.value:
+            values = [pyLiteral(v, arg.lineNo) for v in arg.value.split("|")]
+            self.value = values[0]
+            self.values = "[%s]" % ", ".join(values)
+        self.hasValueCheck = bool(member.values)
+        self.delimiter = arg.delimiter
+        self.delimiterString = pyString(arg.delimiter)
+        self.minValues = arg.minDelimiters + 1
+        self.maxValues = arg.maxDelimiters + 1
+        self.hasMinValues = self.minValues != 1
+        self.hasMaxValues = self.maxValues != 0
+        self.hasMinOrMaxValues = self.hasMinValues or self.hasMaxValues
+        self.hasFixedNumberOfValues = self.minValues == self.maxValues
+        self.isStringMember = member.isString
+        self.maxCount = member.maxCount
+        self.hasMaxCount = self.maxCount != -1
+        self.className = parent.className
+        self.functionName = parent.functionName
+        self.isTrackable = isTrackable(member)
+        self.hasDefault = member.default
+        if member.type in ("help", "info"):
+            self.convert = "_toBool"
+        else:
+            self.convert = parent.convert(member)
+        self.check = "_check_" + member.name if member.values else "None"
+        self.checkArgument = ", " + self.check if member.values else ""
+        self.separatedValuesMessage = pyString(
+                'the option value must contain %d values separated by "%s".'
+                % (self.minValues, arg.delimiter))
+        self.action = []
+        if arg.action:
+            self.action = pyCode(arg.action, "exec", arg.lineNo)
+        self.condition = None
+        if arg.condition:
+            self.condition = pyCode(arg.condition, "eval", arg.lineNo)[0]
+            self.conditionMessage = pyString(arg.conditionMessage)
+
+    def noValueCheck(self, params, context):
+        return codegen.makeLines(noValueCheckTemplate, self)[:-1]
+
+    def conditionAndAction(self, params, context):
+        return codegen.makeLines(conditionAndActionTemplate, self)[:-1]
+
+def templateFileName():
+    return os.path.join(os.path.dirname(__file__), "py_template.txt")
+
+@profiling.profiled("argparser_py.createFile")
+def createFile(fileName, text, opts, args, members, onlyIfChanged=False,
+               **kw):
+    pyTemplate = open(templateFileName()).read()
+    kw["fileName"] = fileName
+    return codegen.writeFile(fileName,
+                             codegen.makeText(
+                                     pyTemplate,
+                                     PyExpander(text, opts, args, members,
+                                                **kw)),
+                             onlyIfChanged)
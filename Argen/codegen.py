@@ -1,3 +1,5 @@
+import profiling
+
 class Error(Exception):
     pass
 
@@ -32,6 +34,42 @@ def _tokenize(tmplStr):
                 yield "EXPAND", line[start:end]
             start = end + 3
 
+def _splitKey(text):
+    b = text.find("(")
+    if b == -1:
+        return text, ()
+    e = text.rfind(")")
+    if e < b:
+        raise Error("No closing parenthesis: " + text)
+    return text[:b], [s.strip() for s in text[b + 1:e].split(",")]
+
+_compiledTemplates = {}
+
+def _compile(template):
+    """_compile(template string) -> tuple of tokens
+
+    Returns the tokens of template with the keys of IF, ELIF and EXPAND
+    tokens split into name and parameters. The tokens are cached, each
+    template is only tokenized once.
+    """
+    tokens = _compiledTemplates.get(template)
+    if tokens is not None:
+        return tokens
+    tokens = []
+    lineNo = 1
+    try:
+        for ttype, tstr in _tokenize(template):
+            if ttype in ("IF", "ELIF", "EXPAND"):
+                tstr = _splitKey(tstr)
+            elif ttype == "NEWLINE":
+                lineNo += 1
+            tokens.append((ttype, tstr))
+    except Error as ex:
+        raise Error("[line %d]: %s" % (lineNo, str(ex)))
+    tokens = tuple(tokens)
+    _compiledTemplates[template] = tokens
+    return tokens
+
 class Expander(object):
     def __init__(self, context=("", 0)):
         self.context = context
@@ -88,7 +126,7 @@ class TemplateProcessor:
     def __call__(self):
         ignoreNewline = False
         try:
-            for ttype, tstr in _tokenize(self.template):
+            for ttype, tstr in _compile(self.template):
                 if ignoreNewline:
                     ignoreNewline = False
                     if ttype == "NEWLINE":
@@ -235,17 +273,8 @@ class TemplateProcessor:
             self.curline = [text[npos + 1:]]
             self.column = len(text) - npos + 1
 
-    def _splitKey(self, text):
-        b = text.find("(")
-        if b == -1:
-            return text, ()
-        e = text.find(")", b + 1)
-        if e == -1:
-            raise Error("No closing parenthesis: " + text)
-        return text[:b], [s.strip() for s in text[b + 1:e].split(",")]
-
     def _expand(self, key):
-        key, params = self._splitKey(key)
+        key, params = key
         return self.expander(key, params, (self._indentation(), self.column))
 
     def _indentation(self):
@@ -259,6 +288,8 @@ class TemplateProcessor:
         ind = self._indentation()
         return ind + " " * (self.column - len(ind))
 
+@profiling.profiled("codegen.makeLines",
+                    lambda template, expanderFunc: template)
 def makeLines(template, expanderFunc):
     proc = TemplateProcessor(template, expanderFunc)
     proc()
@@ -295,6 +326,7 @@ class LineBuilder:
             self._addText(last)
             self.append(text, sep, newlineSep)
 
+    @profiling.profiled("LineBuilder.join")
     def join(self, strings, sep=" ", newlineSep="", firstSep="", firstNewlineSep=""):
         try:
             i = iter(strings)
@@ -323,6 +355,23 @@ def join(strings, lineWidth=80, sep=" ", newlineSep="", firstSep="", firstNewlin
     lb.join(strings, sep, newlineSep, firstSep, firstNewlineSep)
     return lb.build()
 
+@profiling.profiled("codegen.writeFile")
+def writeFile(fileName, text, onlyIfChanged=False):
+    """writeFile(file name, text, onlyIfChanged) -> bool
+
+    Writes text to the file. If onlyIfChanged is True and the file already
+    contains text it is left untouched, thereby keeping its modification
+    time. Returns True if the file was written.
+    """
+    if onlyIfChanged:
+        try:
+            if open(fileName).read() == text:
+                return False
+        except IOError:
+            pass
+    open(fileName, "w").write(text)
+    return True
+
 def _translateToSpace(s, chars):
     # Slow (but not noticably so in this context) replacement for maketrans and
     # translate. I couldn't find a way to use maketrans and translate that
@@ -0,0 +1,82 @@
+"""
+    A small LZ77 compressor for the help text embedded in the generated
+    parser.
+
+    The compressed data is a sequence of tokens, each starting with a
+    control byte C:
+
+    * C < 0x80: a run of C + 1 literal bytes follows.
+    * C >= 0x80: copy C - 0x80 + 3 bytes from an earlier position in the
+      output. The distance back to that position follows as a 16-bit
+      big-endian number. The copied bytes may overlap the ones being
+      written.
+
+    The generated decompressHelpText function must decode the same format.
+"""
+
+MinMatchLength = 3
+MaxMatchLength = 0x7F + MinMatchLength
+MaxLiteralRun = 0x80
+MaxDistance = 0xFFFF
+MaxChainLength = 64
+
+def _matchLength(data, candidate, pos):
+    end = min(len(data), pos + MaxMatchLength)
+    i = pos
+    while i < end and data[candidate + i - pos] == data[i]:
+        i += 1
+    return i - pos
+
+def _longestMatch(data, pos, chains):
+    """_longestMatch(data, pos, chains) -> (length, distance)
+
+    Returns the longest match for the bytes at pos among the earlier
+    positions in chains that start with the same three bytes.
+    """
+    bestLength, bestDistance = 0, 0
+    candidates = chains.get(bytes(data[pos:pos + MinMatchLength]), ())
+    for candidate in candidates[:-MaxChainLength - 1:-1]:
+        if pos - candidate > MaxDistance:
+            break
+        length = _matchLength(data, candidate, pos)
+        if length > bestLength:
+            bestLength, bestDistance = length, pos - candidate
+            if length == MaxMatchLength:
+                break
+    return bestLength, bestDistance
+
+def _addPosition(data, pos, chains):
+    if pos + MinMatchLength <= len(data):
+        key = bytes(data[pos:pos + MinMatchLength])
+        chains.setdefault(key, []).append(pos)
+
+def _addLiterals(output, literals):
+    for i in range(0, len(literals), MaxLiteralRun):
+        run = literals[i:i + MaxLiteralRun]
+        output.append(len(run) - 1)
+        output.extend(run)
+
+def compress(data):
+    """compress(bytearray) -> bytearray
+
+    Returns data compressed with a greedy LZ77 encoder.
+    """
+    output = bytearray()
+    chains = {}
+    literalStart = pos = 0
+    while pos < len(data):
+        length, distance = _longestMatch(data, pos, chains)
+        if length < MinMatchLength:
+            _addPosition(data, pos, chains)
+            pos += 1
+            continue
+        _addLiterals(output, data[literalStart:pos])
+        output.append(0x80 + length - MinMatchLength)
+        output.append(distance >> 8)
+        output.append(distance & 0xFF)
+        for i in range(pos, pos + length):
+            _addPosition(data, i, chains)
+        pos += length
+        literalStart = pos
+    _addLiterals(output, data[literalStart:])
+    return output
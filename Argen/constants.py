@@ -1,7 +1,7 @@
 ArgumentProps = set(("action", "argument", "condition", "conditionmessage",
                      "count", "delimiter", "delimitercount",
                      "flags", "index", "member", "text", "value"))
-MemberProps = set(("default", "include", "includecpp", "memberaction",
+MemberProps = set(("default", "env", "include", "includecpp", "memberaction",
                    "membercondition",
                    "memberconditionmessage", "type", "values", "valuetype"))
 PropAliases = {
@@ -10,6 +10,7 @@ PropAliases = {
     "condmsg": "conditionmessage",
     "del": "delimiter",
     "delcount": "delimitercount",
+    "environment": "env",
     "memcond": "membercondition",
     "memcondmessage": "memberconditionmessage",
     "memcondmsg": "memberconditionmessage",
@@ -23,3 +24,15 @@ DefaultEndDefinition = "}}"
 DefaultDefinitionSeparator = "|"
 
 IntegerArguments = set(("NUM", "COUNT", "INT", "SIZE", "LEN", "LENGTH"))
+
+IntegerValueTypes = set((
+    "short", "short int", "int", "long", "long int", "long long",
+    "long long int", "signed", "unsigned", "unsigned short",
+    "unsigned short int", "unsigned int", "unsigned long",
+    "unsigned long int", "unsigned long long", "unsigned long long int",
+    "size_t", "ptrdiff_t", "intmax_t", "uintmax_t",
+    "int16_t", "int32_t", "int64_t", "uint16_t", "uint32_t", "uint64_t",
+    "std::size_t", "std::ptrdiff_t", "std::intmax_t", "std::uintmax_t",
+    "std::int16_t", "std::int32_t", "std::int64_t",
+    "std::uint16_t", "std::uint32_t", "std::uint64_t"))
+FloatingPointValueTypes = set(("float", "double", "long double"))
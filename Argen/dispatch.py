@@ -0,0 +1,220 @@
+"""
+    Functions for computing the lookup structures used by the generated
+    findOptionProcessor and findAbbreviatedOption functions.
+
+    The actual C++ code is produced by argparser_cpp.py, this module only
+    computes the perfect hash seeds, the switch cascade and the trie of
+    abbreviations at generation time.
+"""
+from error import Error
+
+DispatchStrategies = ("linear", "switch", "hash")
+
+def _bytes(s):
+    return bytearray(s.encode("utf-8"))
+
+def flagHash(flag, seed):
+    """flagHash(flag, seed) -> int
+
+    A 32-bit FNV-1a hash of the UTF-8 representation of flag, followed by
+    a final mixing step that makes the low bits depend on the seed. The
+    generated hashFlag function must give the same result.
+    """
+    h = (2166136261 ^ seed) & 0xFFFFFFFF
+    for c in _bytes(flag):
+        h = ((h ^ c) * 16777619) & 0xFFFFFFFF
+    h ^= h >> 16
+    h = (h * 0x85EBCA6B) & 0xFFFFFFFF
+    h ^= h >> 13
+    return h
+
+def makePerfectHash(flags, maxSeed=0xFFFF):
+    """makePerfectHash(list of strings) -> (seeds, slots)
+
+    Computes a minimal perfect hash of flags with the "hash and displace"
+    method. The lookup of a flag f is:
+
+        seed = seeds[flagHash(f, 0) % len(seeds)]
+        slot = flagHash(f, seed) % len(slots)
+
+    slots[slot] is then either f or a different flag, in which case f isn't
+    among the known flags.
+    """
+    size = len(flags)
+    buckets = [[] for i in range(size)]
+    for f in flags:
+        buckets[flagHash(f, 0) % size].append(f)
+    order = sorted(range(size), key=lambda i: -len(buckets[i]))
+    seeds = [0] * size
+    slots = [None] * size
+    for i in order:
+        bucket = buckets[i]
+        if not bucket:
+            break
+        for seed in range(1, maxSeed + 1):
+            taken = set()
+            for f in bucket:
+                slot = flagHash(f, seed) % size
+                if slots[slot] is not None or slot in taken:
+                    break
+                taken.add(slot)
+            else:
+                break
+        else:
+            raise Error("unable to find a perfect hash for the option flags.")
+        seeds[i] = seed
+        for f in bucket:
+            slots[flagHash(f, seed) % size] = f
+    return seeds, slots
+
+def _bestPosition(flags, usedPositions):
+    best, bestCount = -1, 0
+    for pos in range(len(flags[0][1])):
+        if pos in usedPositions:
+            continue
+        count = len(set(b[pos] for f, b in flags))
+        if count > bestCount:
+            best, bestCount = pos, count
+    return best
+
+def _makeSwitchTree(flags, usedPositions):
+    if len(flags) == 1:
+        return flags[0][0]
+    pos = _bestPosition(flags, usedPositions)
+    groups = {}
+    for f, b in flags:
+        groups.setdefault(b[pos], []).append((f, b))
+    used = usedPositions + (pos,)
+    return pos, [(c, _makeSwitchTree(groups[c], used)) for c in sorted(groups)]
+
+def makeSwitchTree(flags):
+    """makeSwitchTree(list of strings of equal length) -> tree
+
+    Returns either a single flag (a leaf) or a tuple (pos, children) where
+    pos is the index of the byte that is switched on and children is
+    a sorted list of (byte value, subtree).
+    """
+    return _makeSwitchTree([(f, _bytes(f)) for f in flags], ())
+
+def groupByLength(flags):
+    """groupByLength(list of strings) -> sorted list of (length, flags)
+    """
+    groups = {}
+    for f in flags:
+        groups.setdefault(len(_bytes(f)), []).append(f)
+    return [(n, sorted(groups[n])) for n in sorted(groups)]
+
+def _completions(processors, prefix):
+    """_completions(list of (flag, function), prefix) -> (flag, flags)
+
+    Returns the flag that prefix abbreviates and the flags starting with
+    prefix. The flag is None if the flags belong to different options.
+    Flags that belong to the same option, i.e. that have the same function,
+    aren't ambiguous, the shortest of them is the one that is abbreviated.
+    """
+    prefix = _bytes(prefix) if not isinstance(prefix, bytearray) else prefix
+    matches = [(f, func) for f, func in processors
+               if _bytes(f).startswith(prefix)]
+    flags = sorted((f for f, func in matches), key=lambda f: (len(f), f))
+    if len(set(func for f, func in matches)) == 1:
+        return flags[0], flags
+    return None, flags
+
+def ambiguityMessage(flags):
+    return "ambiguous option (%s)." % ", ".join(sorted(flags))
+
+def abbreviations(processors, minLength):
+    """abbreviations(list of (flag, function), int) -> (dict, dict)
+
+    Returns two dictionaries with every prefix of the flags in processors
+    that is at least minLength characters long and isn't itself one of the
+    flags. The first maps the unambiguous prefixes to the flag they
+    abbreviate, the second maps the ambiguous prefixes to an error message.
+    """
+    flags = set(f for f, func in processors)
+    unique, ambiguous = {}, {}
+    for f in flags:
+        for n in range(minLength, len(f)):
+            prefix = f[:n]
+            if prefix in flags or prefix in unique or prefix in ambiguous:
+                continue
+            flag, matches = _completions(processors, prefix)
+            if flag:
+                unique[prefix] = flag
+            else:
+                ambiguous[prefix] = ambiguityMessage(matches)
+    return unique, ambiguous
+
+class _TrieNode:
+    def __init__(self):
+        self.children = {}
+        self.isFlag = False
+
+class FlagTrie:
+    """A compressed trie of flags, flattened into arrays.
+
+    The nodes are numbered in breadth first order, which makes the
+    children of each node consecutive. Each node has a label, a slice of
+    labels, whose first character is different from the first character
+    of the labels of the node's siblings. Chains of nodes with a single
+    child are merged into one node, the root is the only node with an
+    empty label.
+
+    Each node is a tuple (labelStart, labelSize, firstChild, childCount,
+    option, ambiguity). All prefixes that end within the node's label
+    start the same flags. If those flags belong to the same option, option
+    is the index in options of the flag the prefixes abbreviate and
+    ambiguity is -1, otherwise option is -1 and ambiguity is an index in
+    ambiguities. Both are -1 if the prefixes are shorter than minLength.
+    """
+    def __init__(self, processors, minLength):
+        self.minLength = minLength
+        self.options = sorted(processors)
+        self.labels = bytearray()
+        self.nodes = []
+        self.ambiguities = []
+        root = _TrieNode()
+        for f, func in self.options:
+            node = root
+            for c in _bytes(f):
+                node = node.children.setdefault(c, _TrieNode())
+            node.isFlag = True
+        self.__flatten(root)
+
+    def __flatten(self, root):
+        flags = [f for f, func in self.options]
+        queue = [(bytearray(), bytearray(), root)]
+        i = 0
+        while i < len(queue):
+            path, label, node = queue[i]
+            firstChild = len(queue)
+            for c in sorted(node.children):
+                childLabel, child = _mergeChain(c, node.children[c])
+                queue.append((path + childLabel, childLabel, child))
+            option, ambiguity = -1, -1
+            # Flags are found before abbreviations, a node whose only
+            # prefix is a flag needs neither option nor ambiguity.
+            if (len(path) >= self.minLength and
+                    not (node.isFlag and len(label) == 1)):
+                flag, matches = _completions(
+                        self.options, path[:len(path) - len(label) + 1])
+                if flag:
+                    option = flags.index(flag)
+                else:
+                    ambiguity = self.__addAmbiguity(ambiguityMessage(matches))
+            self.nodes.append((len(self.labels), len(label), firstChild,
+                               len(node.children), option, ambiguity))
+            self.labels.extend(label)
+            i += 1
+
+    def __addAmbiguity(self, message):
+        if message not in self.ambiguities:
+            self.ambiguities.append(message)
+        return self.ambiguities.index(message)
+
+def _mergeChain(c, node):
+    label = bytearray([c])
+    while not node.isFlag and len(node.children) == 1:
+        c, node = list(node.children.items())[0]
+        label.append(c)
+    return label, node
@@ -1,14 +1,9 @@
 import constants
 from error import Error
+import profiling
 import properties
 import utilities
 
-ArgCounter = 0
-OptCounter = 0
-StartDefinition = constants.DefaultStartDefinition
-EndDefinition = constants.DefaultEndDefinition
-DefinitionSeparator = constants.DefaultDefinitionSeparator
-
 class ParserResult:
     def __init__(self, text, args, members, argLineNos):
         self.text = text
@@ -28,24 +23,6 @@ def variableName(s):
     return "_".join(utilities.translateToSpace(
                         s, "'!\"#$%&/()=?+*@.:,;<>^`-[]{}").split())
 
-def variableNameFromFlags(flags):
-    name = ""
-    for flag in flags:
-        if flag in ("/?", "-?"):
-            return "help"
-        elif flag == "--":
-            return "end_of_options"
-        else:
-            newName = variableName(flag)
-            if not name:
-                name = newName
-            elif len(name) <= 1 and len(newName) > 1:
-                name = newName
-    if not name:
-        global OptCounter
-        name = "option_" + str(OptCounter)
-    return name
-
 def parseFlags(text):
     flags = []
     argName = None
@@ -119,160 +96,223 @@ def splitSingle(s, separator, maxCount=-1):
     result.append(s[start:])
     return result
 
-def parseProperties(s):
-    props = {}
-    parts = [p.strip() for p in splitSingle(s, DefinitionSeparator)]
-    for prop in parts:
-        kv = [s.strip() for s in prop.split(":", 1)]
-        if len(kv) != 2:
-            raise Error("invalid property: \"%s\"" % prop)
-        key = kv[0].lower()
-        props[constants.PropAliases.get(key, key)] = kv[1]
-    if "flags" in props:
-        flags = props["flags"].split()
-        for f in flags:
-            if not isLegalFlag(f):
-                raise Error("\"%s\" is an illegal flag (it contains =)" % f)
-    if "type" in props:
-        props["type"] = props["type"].lower()
-        if props["type"] not in constants.LegalTypeValues:
-            raise Error("%(type)s is an illegal value for the type property" %
-                        props)
-    return props
+class OutputText:
+    """The help text without the definitions.
+
+    Keeps track of the state at the end of the text that parseText needs,
+    so it doesn't have to search the text.
+    """
+    def __init__(self):
+        self.parts = []
+        # True if the text is empty or ends with a newline.
+        self.endsWithNewline = True
+        # True if the text after the last newline is whitespace.
+        self.atLineStart = True
+
+    def append(self, s):
+        """Appends s and returns the number of newlines in it.
+        """
+        if not s:
+            return 0
+        self.parts.append(s)
+        i = s.rfind("\n")
+        if i == -1:
+            self.endsWithNewline = False
+            self.atLineStart = self.atLineStart and s.isspace()
+            return 0
+        self.endsWithNewline = i + 1 == len(s)
+        self.atLineStart = self.endsWithNewline or s[i + 1:].isspace()
+        return s.count("\n", 0, i) + 1
 
-def parseArg(s):
-    global ArgCounter
-    if not s:
-        s = "arg %d" % ArgCounter
-    props = dict(argument=s,
-                 name=variableName(s),
-                 textName=s,
-                 autoindex=str(ArgCounter))
-    props["member"] = props["name"]
-    ArgCounter += 1
-    if s:
-        if s[0] == "[":
-            if s.endswith("...") or s.endswith("...]"):
-                props["count"] = "0.."
+    def text(self):
+        return "".join(self.parts)
+
+class HelpTextParser:
+    """Parses help texts.
+
+    The parser carries the parentheses that enclose the definitions and the
+    counters used for naming unnamed arguments and options. The counters
+    are reset for each text, and separate parsers can be used concurrently.
+    """
+    def __init__(self, startDefinition=constants.DefaultStartDefinition,
+                 definitionSeparator=constants.DefaultDefinitionSeparator,
+                 endDefinition=constants.DefaultEndDefinition):
+        self.startDefinition = startDefinition
+        self.definitionSeparator = definitionSeparator
+        self.endDefinition = endDefinition
+        self.argCounter = 0
+        self.optCounter = 0
+
+    def variableNameFromFlags(self, flags):
+        name = ""
+        for flag in flags:
+            if flag in ("/?", "-?"):
+                return "help"
+            elif flag == "--":
+                return "end_of_options"
             else:
-                props["count"] = "0..1"
-        elif s.endswith("..."):
-            props["count"] = "1.."
-        else:
-            props["count"] = "1"
-    return props
+                newName = variableName(flag)
+                if not name:
+                    name = newName
+                elif len(name) <= 1 and len(newName) > 1:
+                    name = newName
+        if not name:
+            name = "option_" + str(self.optCounter)
+        return name
 
-def parseOption(s):
-    global OptCounter
-    OptCounter += 1
-    flags, argument = parseFlags(s)
-    props = dict(flags=" ".join(flags),
-                 textName=s,
-                 name=variableNameFromFlags(flags))
-    props["member"] = props["name"]
-    if argument:
-        props["argument"] = argument
-    return props
+    def parseProperties(self, s):
+        props = {}
+        parts = [p.strip() for p in splitSingle(s, self.definitionSeparator)]
+        for prop in parts:
+            kv = [s.strip() for s in prop.split(":", 1)]
+            if len(kv) != 2:
+                raise Error("invalid property: \"%s\"" % prop)
+            key = kv[0].lower()
+            props[constants.PropAliases.get(key, key)] = kv[1]
+        if "flags" in props:
+            flags = props["flags"].split()
+            for f in flags:
+                if not isLegalFlag(f):
+                    raise Error("\"%s\" is an illegal flag (it contains =)" % f)
+        if "type" in props:
+            props["type"] = props["type"].lower()
+            if props["type"] not in constants.LegalTypeValues:
+                raise Error("%(type)s is an illegal value for the type property" %
+                            props)
+        return props
 
-def parseFlagsProperty(flags):
-    global OptCounter
-    OptCounter += 1
-    props = dict(name=variableNameFromFlags(flags.split()),
-                 textName=flags)
-    props["member"] = props["name"]
-    return props
+    def parseArg(self, s):
+        if not s:
+            s = "arg %d" % self.argCounter
+        props = dict(argument=s,
+                     name=variableName(s),
+                     textName=s,
+                     autoindex=str(self.argCounter))
+        props["member"] = props["name"]
+        self.argCounter += 1
+        if s:
+            if s[0] == "[":
+                if s.endswith("...") or s.endswith("...]"):
+                    props["count"] = "0.."
+                else:
+                    props["count"] = "0..1"
+            elif s.endswith("..."):
+                props["count"] = "1.."
+            else:
+                props["count"] = "1"
+        return props
 
-def parseDefinition(s):
-    parts = splitSingle(s, DefinitionSeparator, 1)
-    text = parts[0]
-    if len(parts) == 2:
-        explicitProps = parseProperties(parts[1])
-    else:
-        explicitProps = {}
-    for key in explicitProps:
-        if key not in constants.LegalProps:
-            raise Error("Unknown property name: " + key)
-    stripped = explicitProps.get("text", text).strip()
-    if "flags" in explicitProps:
-        props = parseFlagsProperty(explicitProps["flags"])
-    elif isOption(stripped):
-        props = parseOption(stripped)
-    else:
-        props = parseArg(stripped)
-    props.update(explicitProps)
-    if "index" in props and "flags" in props:
-        raise Error("Options can't have the index property.")
-    return text, props
+    def parseOption(self, s):
+        self.optCounter += 1
+        flags, argument = parseFlags(s)
+        props = dict(flags=" ".join(flags),
+                     textName=s,
+                     name=self.variableNameFromFlags(flags))
+        props["member"] = props["name"]
+        if argument:
+            props["argument"] = argument
+        return props
 
-def appendText(lst, s):
-    if s:
-        lst.append(s)
-    return s.count("\n")
+    def parseFlagsProperty(self, flags):
+        self.optCounter += 1
+        props = dict(name=self.variableNameFromFlags(flags.split()),
+                     textName=flags)
+        props["member"] = props["name"]
+        return props
 
-def isStartOfLine(textList):
-    for s in reversed(textList):
-        i = s.rfind("\n")
-        if i != -1:
-            return i + 1 == len(s) or s[i + 1:].isspace()
-        elif not s.isspace():
-            return False
-    return True
+    def parseDefinition(self, s):
+        parts = splitSingle(s, self.definitionSeparator, 1)
+        text = parts[0]
+        if len(parts) == 2:
+            explicitProps = self.parseProperties(parts[1])
+        else:
+            explicitProps = {}
+        for key in explicitProps:
+            if key not in constants.LegalProps:
+                raise Error("Unknown property name: " + key)
+        stripped = explicitProps.get("text", text).strip()
+        if "flags" in explicitProps:
+            props = self.parseFlagsProperty(explicitProps["flags"])
+        elif isOption(stripped):
+            props = self.parseOption(stripped)
+        else:
+            props = self.parseArg(stripped)
+        props.update(explicitProps)
+        if "index" in props and "flags" in props:
+            raise Error("Options can't have the index property.")
+        return text, props
 
-def parseText(text):
-    outText = []
-    argProps = []
-    argLineNos = set()
-    prv = (0, 0, None)
-    cur = utilities.findToken(text, StartDefinition, EndDefinition)
-    lineNo = 1
-    skippedNewlines = 0
-    while cur[0] != cur[1]:
-        lineNo += appendText(outText, text[prv[1]:cur[0]])
-        if StartDefinition in cur[2]:
-            raise Error("Definition seems to be missing a closing \"%s\""
-                        % EndDefinition, lineNo)
+    @profiling.profiled("helptextparser.parseText")
+    def parseText(self, text):
+        self.argCounter = 0
+        self.optCounter = 0
+        start, end = self.startDefinition, self.endDefinition
+        outText = OutputText()
+        argProps = []
+        argLineNos = set()
+        lineNo = 1
+        skippedNewlines = 0
+        pos = 0
+        first = text.find(start)
+        while first != -1:
+            lineNo += outText.append(text[pos:first])
+            last = text.find(end, first + len(start))
+            if last == -1:
+                definition = text[first + len(start):]
+                pos = len(text)
+            else:
+                definition = text[first + len(start):last]
+                pos = last + len(end)
+            if start in definition:
+                raise Error("Definition seems to be missing a closing \"%s\""
+                            % end, lineNo)
+            try:
+                txt, props = self.parseDefinition(definition)
+                props["lineno"] = str(lineNo)
+            except Error as ex:
+                ex.lineNo = str(lineNo)
+                raise ex
+            if txt and outText.atLineStart:
+                argLineNos.add(lineNo - skippedNewlines - 1)
+            if ((not txt) and outText.endsWithNewline and
+                    pos != len(text) and text[pos] == "\n"):
+                lineNo += 1
+                skippedNewlines += 1
+                pos += 1
+            outText.append(txt)
+            lineNo += definition.count("\n")
+            argProps.append(props)
+            first = text.find(start, pos)
+        outText.append(text[pos:])
+        return outText.text(), argProps, argLineNos
+
+    @profiling.profiled("helptextparser.parseFile")
+    def parseFile(self, fileName):
         try:
-            txt, props = parseDefinition(cur[2])
-            props["lineno"] = str(lineNo)
+            text, argProps, argLineNos = self.parseText(open(fileName).read())
+            properties.inferIndexProperties(argProps)
+            args = properties.makeArguments(argProps)
+            members = properties.makeMembers(args)
+            for m in members:
+                if m.type == "help":
+                    for a in m.arguments:
+                        if not a.flags:
+                            raise Error("Only options can be of type \"help\".",
+                                        a.lineNo)
+                    break
+            else:
+                raise Error("There is no help-option. Use property "
+                            "\"type: help\" to indicate the help-option.")
+            return ParserResult(text, args, members, argLineNos)
         except Error as ex:
-            ex.lineNo = str(lineNo)
+            ex.fileName = fileName
             raise ex
-        if txt and isStartOfLine(outText):
-            argLineNos.add(lineNo - skippedNewlines - 1)
-        if ((not txt) and
-                (not outText or outText[-1][-1] == "\n") and
-                (cur[1] != len(text) and text[cur[1]] == "\n")):
-            lineNo += 1
-            skippedNewlines += 1
-            cur = cur[0], cur[1] + 1, cur[2]
-        appendText(outText, txt)
-        lineNo += cur[2].count("\n")
-        argProps.append(props)
-        prv = cur
-        cur = utilities.findToken(text, StartDefinition, EndDefinition, cur[1])
-    appendText(outText, text[prv[1]:])
-    return "".join(outText), argProps, argLineNos
+
+def parseText(text):
+    return HelpTextParser().parseText(text)
 
 def parseFile(fileName):
-    try:
-        text, argProps, argLineNos = parseText(open(fileName).read())
-        properties.inferIndexProperties(argProps)
-        args = properties.makeArguments(argProps)
-        members = properties.makeMembers(args)
-        for m in members:
-            if m.type == "help":
-                for a in m.arguments:
-                    if not a.flags:
-                        raise Error("Only options can be of type \"help\".",
-                                    a.lineNo)
-                break
-        else:
-            raise Error("There is no help-option. Use property "
-                        "\"type: help\" to indicate the help-option.")
-        return ParserResult(text, args, members, argLineNos)
-    except Error as ex:
-        ex.fileName = fileName
-        raise ex
+    return HelpTextParser().parseFile(fileName)
 
 # if __name__ == "__main__":
 #     import sys
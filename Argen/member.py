@@ -15,6 +15,7 @@ class Member(object):
         self.minCount, self.maxCount = self.count
         self.include = props.get("include")
         self.includeCpp = props.get("includecpp")
+        self.env = props.get("env")
         self.action = props.get("memberaction")
         self.condition = props.get("membercondition")
         self.conditionMessage = props.get("memberconditionmessage")
@@ -26,11 +27,41 @@ class Member(object):
         else:
             self.memberType = self.valueType
         self.isOption = not any(a for a in self.arguments if not a.flags)
+        self.isString = self.valueType == "std::string"
+        self.isArray = False
+        self.isBitfield = False
+
+    def useStringView(self):
+        """Makes std::string members std::string_view members.
+        """
+        if self.isString:
+            self.valueType = "std::string_view"
+            self.memberType = self.memberType.replace("std::string",
+                                                      "std::string_view")
+
+    def useCompactLayout(self):
+        """Makes multivalue options with a fixed number of values
+        std::array members and bool members that are only set by flags
+        bitfields.
+        """
+        if (self.type == "multivalue" and self.isOption and
+                all(a.delimiter and
+                    a.minDelimiters == a.maxDelimiters == self.maxCount - 1
+                    for a in self.arguments)):
+            self.isArray = True
+            self.memberType = "std::array<%s, %d>" % (self.valueType,
+                                                      self.maxCount)
+        elif (self.type in ("value", "help", "info") and
+              self.valueType == "bool" and self.isOption and
+              all(a.value for a in self.arguments)):
+            self.isBitfield = True
 
     def __getitem__(self, key):
         return self.__getattribute__(key)
 
     def __str__(self):
+        if self.isBitfield:
+            return "%s %s : 1;" % (self.memberType, self.name)
         return "%s %s;" % (self.memberType, self.name)
 
     @property
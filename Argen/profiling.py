@@ -0,0 +1,161 @@
+"""
+    Measures the wall time and number of calls of the stages of the
+    generator when argen is run with --profile.
+
+    The functions that make up the stages are wrapped with the profiled
+    decorator. The wrappers only measure anything while a profile is
+    active, i.e. between start() and stop(). The time spent in a stage
+    includes the time spent in the stages it calls, e.g. the time of each
+    codegen.makeLines call includes the time of the templates expanded
+    within it.
+"""
+import functools
+import json
+import os
+import sys
+import time
+
+try:
+    _clock = time.perf_counter
+except AttributeError:
+    _clock = time.time
+
+class Stage:
+    def __init__(self, name, detail):
+        self.name = name
+        self.detail = detail
+        self.calls = 0
+        self.seconds = 0.0
+
+    def fullName(self):
+        if self.detail:
+            return "%s [%s]" % (self.name, self.detail)
+        return self.name
+
+class Profile:
+    def __init__(self):
+        self.stages = {}
+        self.order = []
+        self.start = _clock()
+        self.seconds = 0.0
+
+    def stage(self, name, detail):
+        """Returns the stage with the given name and detail.
+
+        The stages are listed in the order they were first entered.
+        """
+        stage = self.stages.get((name, detail))
+        if stage is None:
+            stage = Stage(name, detail)
+            self.stages[(name, detail)] = stage
+            self.order.append(stage)
+        return stage
+
+    def nameTemplates(self):
+        """Replaces the template texts in the details of the stages with
+        the names of the templates.
+        """
+        names = _templateNames()
+        for stage in self.order:
+            if stage.detail in names:
+                stage.detail = names[stage.detail]
+            elif "\n" in stage.detail:
+                stage.detail = _describeTemplate(stage.detail)
+
+    def textReport(self):
+        width = max([len("Stage")] + [len(s.fullName()) for s in self.order])
+        lines = ["%-*s %7s %10s" % (width, "Stage", "Calls", "Time (ms)")]
+        for stage in self.order:
+            lines.append("%-*s %7d %10.2f" % (width, stage.fullName(),
+                                              stage.calls,
+                                              stage.seconds * 1000))
+        lines.append("%-*s %7s %10.2f" % (width, "Total", "",
+                                          self.seconds * 1000))
+        return "\n".join(lines)
+
+    def jsonReport(self):
+        stages = [{"stage": s.name, "template": s.detail, "calls": s.calls,
+                   "seconds": s.seconds} if s.detail else
+                  {"stage": s.name, "calls": s.calls, "seconds": s.seconds}
+                  for s in self.order]
+        return json.dumps({"seconds": self.seconds, "stages": stages},
+                          indent=2)
+
+    def report(self, format="text"):
+        if format == "json":
+            return self.jsonReport()
+        return self.textReport()
+
+_profile = None
+
+def start():
+    """start() -> Profile
+
+    Starts collecting timings in a new Profile and returns it.
+    """
+    global _profile
+    _profile = Profile()
+    return _profile
+
+def stop():
+    """stop() -> Profile
+
+    Stops collecting timings and returns the Profile they were collected in.
+    """
+    global _profile
+    profile, _profile = _profile, None
+    if profile:
+        profile.seconds = _clock() - profile.start
+        profile.nameTemplates()
+    return profile
+
+def profiled(name, detail=None):
+    """Decorator that adds the time spent in the decorated function to the
+    stage called name in the active profile.
+
+    If detail is given, it is called with the function's arguments and
+    returns a string that separates the calls into different stages.
+    Details that are templates are replaced with the templates' names in
+    the report.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _profile is None:
+                return func(*args, **kwargs)
+            stage = _profile.stage(name, detail(*args, **kwargs)
+                                         if detail else "")
+            stage.calls += 1
+            start = _clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stage.seconds += _clock() - start
+        return wrapper
+    return decorator
+
+def _templateNames():
+    """Returns a dictionary from template texts to template names.
+
+    Templates are module-level strings whose names end with "Template", or
+    the contents of the files returned by the modules' templateFileName
+    functions.
+    """
+    names = {}
+    for moduleName, module in list(sys.modules.items()):
+        if module is None or not moduleName.startswith("argparser_"):
+            continue
+        for key, value in vars(module).items():
+            if key.endswith("Template") and isinstance(value, str):
+                names[value] = "%s.%s" % (moduleName, key)
+        if hasattr(module, "templateFileName"):
+            fileName = module.templateFileName()
+            try:
+                names[open(fileName).read()] = os.path.basename(fileName)
+            except IOError:
+                pass
+    return names
+
+def _describeTemplate(template):
+    line = template.strip().split("\n")[0]
+    return line if len(line) <= 40 else line[:37] + "..."
@@ -7,6 +7,7 @@ from argument import Argument
 import constants
 from error import Error
 from member import Member
+import profiling
 import utilities
 
 def updateProperties(props, other):
@@ -252,6 +253,8 @@ def inferMemberProperties(props):
         elif "values" in props:
             raise Error("options of type \"%(type)s\" cant have "
                         "the \"values\" property." % props)
+    if "env" in props:
+        inferEnvironmentProperties(props)
     if "default" not in props:
         if not minDel and (props["type"] != "list" or count[0] != 0):
             props["default"] = inferDefaultValue(props)
@@ -261,6 +264,33 @@ def inferMemberProperties(props):
         raise Error("%(name)s: can't have default value when minimum count "
                     "is non-zero." % props)
 
+def inferEnvironmentProperties(props):
+    name = props["env"]
+    if not name or name[0].isdigit() or \
+            any(c for c in name if not c.isalnum() and c != "_"):
+        raise Error('%(name)s: "%(env)s" is not a valid environment variable '
+                    'name.' % props)
+    elif not props["arguments"][0].flags:
+        raise Error("%(name)s: only options can have the env property."
+                    % props)
+    elif props["type"] in ("help", "info", "final"):
+        raise Error('%(name)s: options of type "%(type)s" can\'t have the '
+                    'env property.' % props)
+    elif all(a.value for a in props["arguments"]):
+        raise Error("%(name)s: the env property requires an option that "
+                    "takes a value." % props)
+
+def ensureUniqueEnvironmentNames(members):
+    names = {}
+    for m in members:
+        if not m.env:
+            continue
+        if m.env in names:
+            raise Error("%s and %s: can't use the same environment variable "
+                        "(%s)." % (names[m.env].name, m.name, m.env),
+                        joinLineNos(names[m.env], m))
+        names[m.env] = m
+
 def getMemberProperties(args):
     members = {}
     for arg in args:
@@ -389,6 +419,7 @@ def addOpositeCaseFlags(args):
                 newFlags.append(f.swapcase())
         a.flags.extend(newFlags)
 
+@profiling.profiled("properties.makeArguments")
 def makeArguments(allProps):
     args = []
     reusePropertyCombinations(allProps, "condition", "conditionmessage")
@@ -408,6 +439,7 @@ def makeArguments(allProps):
         addOpositeCaseFlags(args)
     return args
 
+@profiling.profiled("properties.makeMembers")
 def makeMembers(args):
     """makeMembers(list of Argument instances) -> list of Member instances
 
@@ -426,7 +458,9 @@ def makeMembers(args):
             raise ex
     for arg in args:
         arg.member = members[arg.memberName]
-    return sorted(members.values(), key=lambda m: m.name)
+    members = sorted(members.values(), key=lambda m: m.name)
+    ensureUniqueEnvironmentNames(members)
+    return members
 
 def ensureUniqueNames(args):
     names = set()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+"""
+    Measures the time it takes to generate the parser for a synthetic help
+    text with many options.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", "Argen"))
+
+import argparser_cpp
+import argparser_hpp
+import codegen
+import helptextparser
+import helptexts
+
+def readTemplate(name):
+    path = os.path.join(os.path.dirname(argparser_cpp.__file__), name)
+    return open(path).read()
+
+def parseHelpText(text):
+    fd, fileName = tempfile.mkstemp(suffix=".txt")
+    try:
+        os.write(fd, text.encode("utf-8"))
+        os.close(fd)
+        return helptextparser.parseFile(fileName)
+    finally:
+        os.remove(fileName)
+
+def main(args):
+    ap = argparse.ArgumentParser(
+            description="Measures the time spent generating the parser.")
+    ap.add_argument("--options", metavar="N", type=int,
+                    dest="options", default=500,
+                    help="the number of options (default is 500)")
+    ap.add_argument("--repeat", metavar="N", type=int,
+                    dest="repeat", default=5,
+                    help="the number of times each measurement is repeated, "
+                         "the best time is reported (default is 5)")
+    args = ap.parse_args(args[1:])
+
+    result = parseHelpText(helptexts.makeHelpText(args.options))
+    hppTemplate = readTemplate("hpp_template.txt")
+    cppTemplate = readTemplate("cpp_template.txt")
+
+    def makeHpp():
+        codegen.makeText(hppTemplate, argparser_hpp.HppExpander(result.members))
+
+    def makeCpp():
+        codegen.makeText(cppTemplate,
+                         argparser_cpp.CppExpander(result.text,
+                                                   result.options,
+                                                   result.arguments,
+                                                   result.members))
+
+    print("options: %d" % args.options)
+    for name, func in (("hpp", makeHpp), ("cpp", makeCpp)):
+        t = min(timeit.repeat(func, number=1, repeat=args.repeat))
+        print("%s: %.1f ms" % (name, t * 1000))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+"""
+    Measures how the time spent parsing a help text scales with the number
+    of definitions.
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", "Argen"))
+
+import helptextparser
+import helptexts
+
+def makeSingleLineText(definitionCount):
+    """Returns a help text where all the definitions are on the same line
+    and their texts are blank.
+    """
+    return "$prog$ " + " ".join("{{ | flags: --flag-%d}}" % i
+                                for i in range(definitionCount)) + "\n"
+
+def main(args):
+    ap = argparse.ArgumentParser(
+            description="Measures the time spent parsing help texts.")
+    ap.add_argument("--definitions", metavar="N", type=int,
+                    dest="definitions", default=10000,
+                    help="the largest number of definitions (default is "
+                         "10000), the time is also measured for 1/10, 1/5 "
+                         "and 1/2 of this number")
+    ap.add_argument("--repeat", metavar="N", type=int,
+                    dest="repeat", default=3,
+                    help="the number of times each measurement is repeated, "
+                         "the best time is reported (default is 3)")
+    args = ap.parse_args(args[1:])
+
+    print("%12s %12s %12s" % ("definitions", "one per line", "single line"))
+    for fraction in (10, 5, 2, 1):
+        n = args.definitions // fraction
+        times = []
+        for text in (helptexts.makeHelpText(n, 0), makeSingleLineText(n)):
+            parser = helptextparser.HelpTextParser()
+            times.append(min(timeit.repeat(lambda: parser.parseText(text),
+                                           number=1, repeat=args.repeat)))
+        print("%12d %9.1f ms %9.1f ms" % (n, times[0] * 1000, times[1] * 1000))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
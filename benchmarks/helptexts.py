@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+"""
+    Generates synthetic help texts for the benchmarks.
+
+    The options cycle through the kinds of options that produce different
+    code in the generated parser: flags, integer and string values, lists,
+    delimited lists, multi-values, options with value checks and options
+    with conditions.
+"""
+import argparse
+import sys
+
+OptionDefinitions = [
+    "{{--flag-%(i)d}}  Enables feature %(i)d.",
+    "{{--count-%(i)d=N | valuetype: int}}  Sets count %(i)d.",
+    "{{--name-%(i)d=NAME}}  Sets name %(i)d.",
+    "{{--item-%(i)d=ITEM | count: 0..}}  Adds an item to list %(i)d.",
+    "{{--path-%(i)d=PATH:... | delimiter: :}}  Sets paths %(i)d.",
+    "{{--size-%(i)d=W,H | valuetype: int}}  Sets size %(i)d.",
+    "{{--level-%(i)d=N | valuetype: int | values: 0..9}}  Sets level %(i)d.",
+    "{{--limit-%(i)d=N | valuetype: double | cond: $limit_%(i)d$ > 0}}"
+    "  Sets limit %(i)d.",
+]
+
+def makeHelpText(optionCount, argumentCount=2):
+    """makeHelpText(number of options, number of arguments) -> help text
+
+    Returns a help text with optionCount options (including the help
+    option) and argumentCount arguments, using the default parentheses.
+    """
+    lines = ["Usage:",
+             "  $prog$ [options] " +
+             " ".join("<arg%d>" % i for i in range(argumentCount)),
+             "",
+             "Arguments:"]
+    for i in range(argumentCount):
+        lines.append("  {{<arg%d>}}  Argument %d." % (i, i))
+    lines.extend(["", "Options:", "  {{-h, --help | type: help}}  Show help."])
+    for i in range(optionCount - 1):
+        d = OptionDefinitions[i % len(OptionDefinitions)]
+        lines.append("  " + d % {"i": i})
+    return "\n".join(lines) + "\n"
+
+def main(args):
+    ap = argparse.ArgumentParser(
+            description="Writes a synthetic help text to stdout.")
+    ap.add_argument("options", metavar="N", type=int,
+                    help="the number of options")
+    ap.add_argument("--arguments", metavar="N", type=int,
+                    dest="arguments", default=2,
+                    help="the number of arguments (default is 2)")
+    args = ap.parse_args(args[1:])
+    sys.stdout.write(makeHelpText(args.options, args.arguments))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+"""
+    Measures the time and memory spent in each stage of Argen's pipeline
+    for synthetic help texts of different sizes, and writes the results as
+    JSON.
+
+    The stages are:
+        parse       helptextparser: extracting the definitions
+        properties  properties: inferring the arguments and members
+        formatText  argen: word-wrapping the help text
+        hpp         codegen: generating the header file
+        cpp         codegen: generating the source file
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", "Argen"))
+
+import argen
+import argparser_cpp
+import argparser_hpp
+import codegen
+import helptextparser
+import helptexts
+import properties
+
+def makeStages(text):
+    """makeStages(help text) -> list of (name, function)
+
+    Each function takes the result of the previous stage as its argument.
+    """
+    hppTemplate = open(argparser_hpp.templateFileName()).read()
+    cppTemplate = open(argparser_cpp.templateFileName()).read()
+
+    def parse(_):
+        return helptextparser.HelpTextParser().parseText(text)
+
+    def makeMembers(parsed):
+        helpText, argProps, lineNos = parsed
+        properties.inferIndexProperties(argProps)
+        args = properties.makeArguments(argProps)
+        return helptextparser.ParserResult(helpText, args,
+                                           properties.makeMembers(args),
+                                           lineNos)
+
+    def formatText(result):
+        indentation = argen.inferOptionIndentation(result.text,
+                                                   result.definitionLineNos)
+        return result, argen.formatText(result.text,
+                                        result.definitionLineNos,
+                                        79, indentation)
+
+    def makeHpp(state):
+        result, formattedText = state
+        codegen.makeText(hppTemplate,
+                         argparser_hpp.HppExpander(result.members))
+        return state
+
+    def makeCpp(state):
+        result, formattedText = state
+        codegen.makeText(cppTemplate,
+                         argparser_cpp.CppExpander(formattedText,
+                                                   result.options,
+                                                   result.arguments,
+                                                   result.members))
+        return state
+
+    return [("parse", parse), ("properties", makeMembers),
+            ("formatText", formatText), ("hpp", makeHpp), ("cpp", makeCpp)]
+
+def measureTimes(text, repeat):
+    times = {}
+    for i in range(repeat):
+        state = None
+        for name, func in makeStages(text):
+            start = time.perf_counter()
+            state = func(state)
+            t = time.perf_counter() - start
+            times[name] = min(times.get(name, t), t)
+    return times
+
+def measurePeakMemory(text):
+    """Returns the peak memory allocated by each stage, in bytes.
+
+    Memory retained by the previous stages isn't included.
+    """
+    memory = {}
+    state = None
+    for name, func in makeStages(text):
+        tracemalloc.start()
+        try:
+            state = func(state)
+            memory[name] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return memory
+
+def runBenchmark(optionCount, repeat):
+    text = helptexts.makeHelpText(optionCount)
+    times = measureTimes(text, repeat)
+    memory = measurePeakMemory(text)
+    stages = []
+    for name, func in makeStages(text):
+        stages.append({"name": name,
+                       "seconds": times[name],
+                       "peakMemory": memory[name]})
+    return {"options": optionCount,
+            "helpTextSize": len(text),
+            "stages": stages,
+            "seconds": sum(times.values())}
+
+def compareResults(old, new, stream):
+    """Writes the change in time of each stage from old to new.
+    """
+    oldRuns = dict((r["options"], r) for r in old["runs"])
+    stream.write("%8s %-12s %12s %12s %8s\n"
+                 % ("options", "stage", "before", "after", "change"))
+    for run in new["runs"]:
+        oldRun = oldRuns.get(run["options"])
+        if not oldRun:
+            continue
+        oldStages = dict((s["name"], s) for s in oldRun["stages"])
+        for stage in run["stages"]:
+            if stage["name"] not in oldStages:
+                continue
+            before = oldStages[stage["name"]]["seconds"]
+            after = stage["seconds"]
+            stream.write("%8d %-12s %9.2f ms %9.2f ms %+7.1f%%\n"
+                         % (run["options"], stage["name"], before * 1000,
+                            after * 1000, (after - before) * 100 / before))
+
+def main(args):
+    ap = argparse.ArgumentParser(
+            description="Measures the time and memory spent in each stage "
+                        "of Argen's pipeline.")
+    ap.add_argument("--options", metavar="N", type=int, nargs="+",
+                    dest="options", default=[100, 500, 2000],
+                    help="the numbers of options in the synthetic help "
+                         "texts (default is 100 500 2000)")
+    ap.add_argument("--repeat", metavar="N", type=int,
+                    dest="repeat", default=5,
+                    help="the number of times each measurement is repeated, "
+                         "the best time is reported (default is 5)")
+    ap.add_argument("-o", "--output", metavar="FILE",
+                    dest="output", default="",
+                    help="write the JSON to FILE rather than stdout")
+    ap.add_argument("--compare", metavar="FILE",
+                    dest="compare", default="",
+                    help="write the change in time relative to the results "
+                         "in FILE, produced by an earlier run, to stderr")
+    args = ap.parse_args(args[1:])
+
+    results = {"python": platform.python_version(),
+               "platform": platform.platform(),
+               "repeat": args.repeat,
+               "runs": [runBenchmark(n, args.repeat) for n in args.options]}
+    text = json.dumps(results, indent=2, sort_keys=True) + "\n"
+    if args.output:
+        open(args.output, "w").write(text)
+    else:
+        sys.stdout.write(text)
+    if args.compare:
+        compareResults(json.load(open(args.compare)), results, sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
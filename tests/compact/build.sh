@@ -0,0 +1,4 @@
+#!/bin/sh
+DIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" && pwd )"
+clapgen --test '--parenthesis=${ | }$' --compact --hpp=hpp "$DIR/helptext.txt" && \
+c++ -std=c++11 -stdlib=libc++ "$DIR/ParseArguments.cpp" -o ParseArguments
@@ -0,0 +1,8 @@
+#!/bin/sh
+DIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" && pwd )"
+clapgen --test --hpp=hpp --std=c++17 --string-view --deferred-errors "$DIR/helptext.txt" && \
+c++ -std=c++17 -stdlib=libc++ ParseArguments.cpp -o ParseArguments && \
+for ARGS in "-n 50 -o x a" "-s 1 -o x a" "-o x" "-o x a b c" "a" "-q -o x a"
+do
+    ./ParseArguments $ARGS
+done
@@ -0,0 +1,6 @@
+#!/bin/sh
+DIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" && pwd )"
+clapgen --test '--parenthesis=${ | }$' --hpp=hpp "$DIR/helptext.txt" && \
+c++ -std=c++11 -stdlib=libc++ "$DIR/ParseArguments.cpp" -o ParseArguments && \
+APP_COUNT=x ./ParseArguments -c 5 -o out file && \
+APP_INCLUDE=a:b ./ParseArguments -i c -o out file
@@ -0,0 +1,6 @@
+python "%~dp0\..\..\clapgen\clapgen.py" --test --dispatch=linear --file=ParseArguments_linear helptext.txt
+cl /EHsc ParseArguments_linear.cpp
+python "%~dp0\..\..\clapgen\clapgen.py" --test --dispatch=switch --file=ParseArguments_switch helptext.txt
+cl /EHsc ParseArguments_switch.cpp
+python "%~dp0\..\..\clapgen\clapgen.py" --test --dispatch=hash --file=ParseArguments_hash helptext.txt
+cl /EHsc ParseArguments_hash.cpp
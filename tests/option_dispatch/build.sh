@@ -0,0 +1,7 @@
+#!/bin/sh
+DIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" && pwd )"
+for STRATEGY in linear switch hash
+do
+    clapgen --test --hpp=hpp --dispatch=$STRATEGY --file=ParseArguments_$STRATEGY "$DIR/helptext.txt" && \
+    c++ -std=c++11 -stdlib=libc++ ParseArguments_$STRATEGY.cpp -o ParseArguments_$STRATEGY
+done
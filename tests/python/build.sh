@@ -0,0 +1,6 @@
+#!/bin/sh
+DIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" && pwd )"
+clapgen --test --python '--parenthesis=${ | }$' --file=ParseArguments_slash "$DIR/helptext.txt" && \
+clapgen --test --python '--parenthesis=${ | }$' --file=ParseArguments_custom "$DIR/../custom_options/helptext.txt" && \
+python ParseArguments_slash.py /foo /bar=x /baz=1 && \
+python ParseArguments_custom.py alpha=1 bravo=x
@@ -0,0 +1,8 @@
+#!/bin/sh
+DIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" && pwd )"
+clapgen --test --hpp=hpp --response-files --file=ParseArguments_string "$DIR/helptext.txt" && \
+c++ -std=c++11 -stdlib=libc++ ParseArguments_string.cpp -o ParseArguments_string && \
+clapgen --test --hpp=hpp --response-files --std=c++17 --string-view --file=ParseArguments_string_view "$DIR/helptext.txt" && \
+c++ -std=c++17 -stdlib=libc++ ParseArguments_string_view.cpp -o ParseArguments_string_view && \
+(cd "$DIR" && "$OLDPWD/ParseArguments_string" @arguments.txt last.cpp && \
+               "$OLDPWD/ParseArguments_string_view" @arguments.txt last.cpp)
@@ -0,0 +1,5 @@
+#!/bin/sh
+DIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" && pwd )"
+clapgen --stream --hpp=hpp "$DIR/helptext.txt" && \
+c++ -std=c++11 -stdlib=libc++ -I. ParseArguments.cpp "$DIR/main.cpp" -o ParseArguments && \
+printf '3\000prog\000-v\000a.txt\0003\000prog\000-n\00050\0004\000prog\000--number=3\000b\000c\000' | ./ParseArguments
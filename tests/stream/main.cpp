@@ -0,0 +1,22 @@
+#include <iostream>
+#include "ParseArguments.hpp"
+
+int main()
+{
+    ArgumentsParser parser;
+    int count = 0;
+    bool ok = parser.parseStream(0, [&](const Arguments& args)
+    {
+        std::cout << ++count << ": ";
+        if (!args)
+        {
+            std::cout << "error\n";
+            return true;
+        }
+        std::cout << "verbose=" << args.verbose
+                  << " number=" << args.number
+                  << " files=" << args.FILE.size() << "\n";
+        return true;
+    });
+    return ok ? 0 : 1;
+}
@@ -0,0 +1,5 @@
+#!/bin/sh
+DIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" && pwd )"
+clapgen --test --hpp=hpp --std=c++17 --string-view "$DIR/helptext.txt" && \
+c++ -std=c++17 -stdlib=libc++ ParseArguments.cpp -o ParseArguments && \
+./ParseArguments -ab -nfoo --tag=x -t y --point=1,2 --mode=slow file1 file2